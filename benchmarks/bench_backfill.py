@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Times the season fetch of matches_times as one query and as a backfill per window, served locally.
+
+The backfill must return the same events in the same order as the single query. Warm runs read the closed
+windows from disk, so only the open windows at the end are requested again.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import matches_times
+from stand_in import CalendarStandIn
+from synthetic import generate_calendar
+
+CALENDAR_ID = 'halabmlan@gmail.com'
+# pet sezon od SEASON_START
+SIZE = 22000
+
+
+def measure(func, *args, **kwargs):
+    begin = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - begin) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Single season query vs. windowed backfill of matches_times')
+    parser.add_argument('--events', type=int, default=SIZE, help='Events in the synthetic calendar')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    items = generate_calendar('la', args.events, args.seed, start=matches_times.SEASON_START.date())
+    with tempfile.TemporaryDirectory(prefix='hockey-backfill-') as work_dir, \
+            CalendarStandIn({CALENDAR_ID: items}) as server:
+        expected, single_time = measure(lambda: list(matches_times.iter_season_events(CALENDAR_ID, server.url)))
+        print('{0} events until {1:%Y-%m-%d}'.format(len(expected), expected[-1].start_time))
+        print('  {0:<16} {1:10.1f} ms'.format('single query', single_time))
+
+        failed = False
+        # uprostred dat, aby zbyla i otevrena okna
+        now = expected[len(expected) * 4 // 5].start_time.replace(tzinfo=None)
+        for period in ['month', 'season']:
+            directory = '{0}/{1}'.format(work_dir, period)
+            for run in ['cold', 'warm']:
+                events, elapsed = measure(matches_times.backfill_season_events, CALENDAR_ID, directory, period,
+                                          server.url, now)
+                ok = [(event.id, event.updated) for event in events] == \
+                    [(event.id, event.updated) for event in expected]
+                failed = failed or not ok
+                print('  {0:<16} {1:10.1f} ms {2}'.format('{0} {1}'.format(period, run), elapsed,
+                                                          'OK' if ok else 'MISMATCH'))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import sys
+import timeit
+from pathlib import Path
+
+from dateutil.parser import parse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from date_parsing import parse_czech_datetime, parse_event_time, parse_rfc3339
+
+ITEM = {
+    'start': {'dateTime': '2019-09-28T20:15:00+02:00'},
+    'end': {'dateTime': '2019-09-28T21:30:00+02:00'},
+    'created': '2019-08-01T10:11:12.000Z',
+    'updated': '2019-09-20T08:09:10.123Z',
+}
+CZECH_LINE = 'Sobota 28.09.2019 20:15:00'
+
+
+def dateutil_event():
+    parse(ITEM['start']['dateTime'])
+    parse(ITEM['end']['dateTime'])
+    parse(ITEM['created'])
+    parse(ITEM['updated'])
+
+
+def fast_event():
+    parse_event_time(ITEM['start'])
+    parse_event_time(ITEM['end'])
+    parse_rfc3339(ITEM['created'])
+    parse_rfc3339(ITEM['updated'])
+
+
+def fast_event_uncached():
+    parse_rfc3339.cache_clear()
+    fast_event()
+
+
+def dateutil_czech():
+    splitted = CZECH_LINE.split(' ')
+    parse(splitted[1] + ' ' + splitted[2], dayfirst=True)
+
+
+def fast_czech_uncached():
+    parse_czech_datetime.cache_clear()
+    parse_czech_datetime(CZECH_LINE)
+
+
+def main():
+    number = 20000
+    for name, func in [
+        ('dateutil, per event', dateutil_event),
+        ('date_parsing, per event (no cache hits)', fast_event_uncached),
+        ('date_parsing, per event (memoized)', fast_event),
+        ('dateutil, per czech date', dateutil_czech),
+        ('date_parsing, per czech date (no cache hits)', fast_czech_uncached),
+    ]:
+        best = min(timeit.repeat(func, number=number, repeat=3)) / number
+        print('{0:<48} {1:8.2f} us'.format(name, best * 1e6))
+
+
+if __name__ == '__main__':
+    main()
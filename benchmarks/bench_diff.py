@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+import datetime
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from changes import diff_events
+from events import Event
+
+SIZES = [1000, 10000, 100000]
+# puvodni algoritmus s linearnim hledanim je kvadraticky, vetsi snapshoty by trvaly minuty
+LEGACY_MAX_SIZE = 10000
+
+
+def synthetic_snapshots(size, change_ratio=0.05):
+    start = datetime.datetime(2024, 9, 1, 6, 0, tzinfo=datetime.timezone.utc)
+    updated = datetime.datetime(2024, 8, 1, tzinfo=datetime.timezone.utc)
+    old_events = []
+    for i in range(size):
+        begin = start + datetime.timedelta(minutes=75 * i)
+        old_events.append(Event('LHL č. {0} Bystřec \\ Udánky 1.liga'.format(i), begin,
+                                begin + datetime.timedelta(minutes=75), updated, updated, 'event{0}'.format(i)))
+
+    rnd = random.Random(size)
+    changed = max(1, int(size * change_ratio))
+    new_events = list(old_events)
+    for i in rnd.sample(range(size), changed):
+        new_events[i] = new_events[i].replace(updated=updated + datetime.timedelta(days=1))
+    removed = set(rnd.sample(range(size), changed))
+    new_events = [event for i, event in enumerate(new_events) if i not in removed]
+    new_events.extend(old_events[0].replace(id='added{0}'.format(i)) for i in range(changed))
+    return old_events, new_events
+
+
+def legacy_diff(old_events, new_events):
+    def get_event_by_id(events, id):
+        for event in events:
+            if event.id == id:
+                return event
+        return None
+
+    new_ids = [event.id for event in new_events]
+    old_ids = [event.id for event in old_events]
+    added = [get_event_by_id(new_events, id) for id in set(new_ids) - set(old_ids)]
+    removed = [get_event_by_id(old_events, id) for id in set(old_ids) - set(new_ids)]
+    updated = []
+    for new_event in new_events:
+        old_event = get_event_by_id(old_events, new_event.id)
+        if old_event is not None and old_event.updated != new_event.updated:
+            updated.append(new_event)
+    return added, removed, updated
+
+
+def measure(func, *args):
+    begin = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - begin
+
+
+def main():
+    print('{0:>8} {1:>14} {2:>14}'.format('events', 'diff_events', 'legacy'))
+    for size in SIZES:
+        old_events, new_events = synthetic_snapshots(size)
+        new_time = min(measure(diff_events, old_events, new_events) for _ in range(3))
+        if size <= LEGACY_MAX_SIZE:
+            legacy = '{0:11.1f} ms'.format(measure(legacy_diff, old_events, new_events) * 1000)
+        else:
+            legacy = '-'
+        print('{0:>8} {1:11.1f} ms {2:>14}'.format(size, new_time * 1000, legacy))
+
+
+if __name__ == '__main__':
+    main()
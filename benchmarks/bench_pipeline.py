@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""End-to-end and per-stage timings of the reader and matches_times on synthetic calendars.
+
+Every run appends its results to results.jsonl (not versioned) together with the commit it measured
+and compares them with the last run of another commit on the same machine.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import locale
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import hockey_calendar_reader as reader
+import matches_times
+from calendar_api import EVENT_FIELDS, ResponseCache, events_url, iter_items
+from changes import diff_events
+from date_parsing import parse_date, parse_rfc3339
+from instrumentation import get_report
+from outbox import Outbox
+from publisher import OutputPublisher
+from stand_in import CalendarStandIn
+from synthetic import generate, mutate
+from views import ViewRouter
+
+RESULTS = Path(__file__).resolve().parent / 'results.jsonl'
+SIZES = [1000, 10000]
+STAGES = ['fetch', 'fetch_cached', 'parse', 'filter', 'diff', 'render', 'free_slots', 'aggregate', 'end_to_end']
+# kratsi stage jsou zatizene sumem
+MIN_COMPARED_MS = 5.0
+
+CONFIG = '''[GENERAL]
+LOG = {0}/reader.log
+OUTPUT_DIR = {0}/out
+CACHE_DIR = {0}/cache
+RECIPIENTS = bench@localhost
+
+[EMAIL-BREVO]
+SENDER = bench@localhost
+SMTP_SERVER = localhost
+
+[CALENDAR]
+API_KEY = bench
+API_URL = {1}
+INCREMENTAL_SYNC = no
+'''
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + '-dirty' if dirty else commit
+
+
+def setup_reader(work_dir, api_url):
+    config_path = Path(work_dir) / 'config.ini'
+    config_path.write_text(CONFIG.format(work_dir, api_url), encoding='utf-8')
+    try:
+        reader.setup(str(config_path))
+    except locale.Error:
+        # bez ceskeho locale se lisi jen nazvy dnu ve vystupech
+        pass
+
+
+def fetch(api_url, cache=None):
+    params = {'key': 'bench', 'singleEvents': 'True', 'orderBy': 'startTime', 'maxResults': 2500,
+              'fields': EVENT_FIELDS}
+    return {rink: list(iter_items(events_url(calendar_id, api_url), params, cache))
+            for rink, calendar_id in reader.CALENDARS.items()}
+
+
+def parse(items_by_calendar):
+    parse_rfc3339.cache_clear()
+    parse_date.cache_clear()
+    return {rink: list(reader.iter_calendar_events(items)) for rink, items in items_by_calendar.items()}
+
+
+def diff(old_routed, new_routed):
+    return [diff_events(old_routed[view.name], new_routed[view.name]) for view in reader.VIEWS if view.notify]
+
+
+def render(output_dir, routed):
+    with OutputPublisher(output_dir) as publisher:
+        for view in reader.VIEWS:
+            reader.print_events_to_textfile(routed[view.name], publisher, view.text_file)
+            reader.generate_html_from_events(publisher, routed[view.name], view.html_file, view.headline)
+
+
+def free_slots(events_by_calendar):
+    return [reader.get_available_slots(events_by_calendar[calendar]) for calendar, _, _ in reader.AVAILABLE_PAGES]
+
+
+def end_to_end(output_dir, previous_events):
+    reader.config['GENERAL']['OUTPUT_DIR'] = output_dir
+    get_report().reset()
+    calendars = list(reader.CALENDARS)
+    fetched = reader.fetch_concurrently(reader.get_events_from_calendar,
+                                        [reader.CALENDARS[calendar] for calendar in calendars])
+    outbox = Outbox('{0}/outbox.sqlite'.format(output_dir))
+    reader.process_events(dict(zip(calendars, fetched)), previous_events, outbox)
+    outbox.close()
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def run(size, seed, repeat):
+    generated = generate(size, seed)
+    current = {rink: mutate(items, seed=seed) for rink, items in generated.items()}
+
+    with tempfile.TemporaryDirectory(prefix='hockey-bench-') as work_dir, \
+            CalendarStandIn({reader.CALENDARS[rink]: items for rink, items in current.items()}) as server:
+        setup_reader(work_dir, server.url)
+        router = ViewRouter(reader.VIEWS)
+
+        old_routed = router.route(parse(generated))
+        items = fetch(server.url)
+        # nezmeneny kalendar: jen revalidace pres ETag, telo z disku
+        cache = ResponseCache('{0}/http'.format(work_dir))
+        fetch(server.url, cache)
+        events = parse(items)
+        routed = router.route(events)
+        previous_events = {view.name: old_routed[view.name] for view in reader.VIEWS if view.notify}
+
+        runs = itertools.count()
+        timings = {
+            'fetch': best_of(repeat, fetch, server.url),
+            'fetch_cached': best_of(repeat, fetch, server.url, cache),
+            'parse': best_of(repeat, parse, items),
+            'filter': best_of(repeat, router.route, events),
+            'diff': best_of(repeat, diff, old_routed, routed),
+            # kazde opakovani do prazdneho adresare, jinak by se nezmenene soubory preskocily
+            'render': best_of(repeat, lambda: render('{0}/render{1}'.format(work_dir, next(runs)), routed)),
+            'free_slots': best_of(repeat, free_slots, events),
+            'aggregate': best_of(repeat, matches_times.aggregate_teams, events['la']),
+            'end_to_end': best_of(repeat, lambda: end_to_end('{0}/run{1}'.format(work_dir, next(runs)), previous_events)),
+        }
+        pipeline = get_report().as_dict()['stages']
+
+    return {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'size': size,
+        'seed': seed,
+        'repeat': repeat,
+        'stages': {name: round(timings[name], 3) for name in STAGES},
+        'pipeline': pipeline,
+    }
+
+
+def load_results(path):
+    if not path.is_file():
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_baseline(results, result, commit=None):
+    for previous in reversed(results):
+        if previous['size'] != result['size'] or previous['host'] != result['host']:
+            continue
+        if commit is not None and previous['commit'].startswith(commit):
+            return previous
+        if commit is None and previous['commit'] != result['commit']:
+            return previous
+    return None
+
+
+def report(result, baseline, threshold):
+    regressions = []
+    print('{0} events, commit {1}{2}'.format(
+        result['size'], result['commit'], ', baseline {0}'.format(baseline['commit']) if baseline else ''))
+    for name in STAGES:
+        elapsed = result['stages'][name]
+        line = '  {0:<12} {1:10.1f} ms'.format(name, elapsed)
+        if baseline and name in baseline['stages']:
+            previous = baseline['stages'][name]
+            ratio = elapsed / previous if previous else 1.0
+            line += ' {0:10.1f} ms {1:6.2f}x'.format(previous, ratio)
+            if ratio > threshold and previous >= MIN_COMPARED_MS:
+                line += ' REGRESSION'
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the pipeline on synthetic calendars served locally')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Events in all calendars, e.g. 1000 100000')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='Best of REPEAT runs is reported')
+    parser.add_argument('--results', type=Path, default=RESULTS)
+    parser.add_argument('--baseline', help='Compare with this commit instead of the last other commit')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown reported as a regression')
+    parser.add_argument('--check', action='store_true', help='Exit with 1 when a stage regressed')
+    parser.add_argument('--no-save', action='store_true', help='Do not append the results')
+    args = parser.parse_args()
+
+    previous_results = load_results(args.results)
+    regressions = []
+    for size in args.sizes:
+        result = run(size, args.seed, args.repeat)
+        regressions += report(result, find_baseline(previous_results, result, args.baseline), args.threshold)
+        if not args.no_save:
+            with open(args.results, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    sys.exit(1 if args.check and regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Throughput of a reader run over many synthetic rinks, in threads of one process and in WORKERS processes.
+
+Each rink gets the views of Lanškroun or Česká Třebová under its own names, so every shard does the same work
+as a real calendar: fetch, parse, history, route, render, free slots and diff.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import hockey_calendar_reader as reader
+from bench_pipeline import setup_reader
+from outbox import Outbox
+from stand_in import CalendarStandIn
+from synthetic import generate_calendar
+from views import View
+
+
+def rinks(count, size, seed):
+    calendars = {}
+    views = []
+    available_pages = []
+    for i in range(count):
+        base = ['la', 'ct'][i % 2]
+        rink = 'r{0:02d}'.format(i)
+        calendars[rink] = '{0}@bench'.format(rink)
+        views += [View(rink, view.keywords, '{0}-{1}'.format(view.name, rink), view.headline, view.notify)
+                  for view in reader.VIEWS if view.calendar == base]
+        available_pages.append((rink, 'available-{0}'.format(rink), 'Volné termíny {0}'.format(rink)))
+    items = {calendars[rink]: generate_calendar(['la', 'ct'][i % 2], size, seed + i)
+             for i, rink in enumerate(calendars)}
+    return calendars, views, available_pages, items
+
+
+def run(config_path, calendars, outbox):
+    executor = reader.create_executor(config_path)
+    try:
+        # prvni beh vytvori snapshoty, historii a procesy
+        reader.publish_results(reader.run_shards(calendars, executor=executor), outbox)
+        begin = time.perf_counter()
+        reader.publish_results(reader.run_shards(calendars, executor=executor), outbox)
+        return time.perf_counter() - begin
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reader throughput over many rinks, in threads and in processes')
+    parser.add_argument('--rinks', type=int, default=12)
+    parser.add_argument('--events', type=int, default=3000, help='Events per rink')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, os.cpu_count() or 1],
+                        help='Process counts to compare, 0 runs the shards in threads of this process')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    calendars, views, available_pages, items = rinks(args.rinks, args.events, args.seed)
+    with tempfile.TemporaryDirectory(prefix='hockey-shards-') as work_dir, CalendarStandIn(items) as server:
+        config_path = '{0}/config.ini'.format(work_dir)
+        setup_reader(work_dir, server.url)
+        reader.CALENDARS.clear()
+        reader.CALENDARS.update(calendars)
+        reader.VIEWS[:] = views
+        reader.AVAILABLE_PAGES[:] = available_pages
+        outbox = Outbox('{0}/outbox.sqlite'.format(work_dir))
+
+        print('{0} rinks x {1} events, {2} CPUs'.format(args.rinks, args.events, os.cpu_count()))
+        baseline = None
+        for workers in args.workers:
+            reader.config['GENERAL']['WORKERS'] = str(workers)
+            elapsed = run(config_path, list(calendars), outbox)
+            baseline = baseline or elapsed
+            print('  {0:>2} workers {1:8.0f} ms {2:8.0f} events/s {3:5.2f}x'.format(
+                workers, elapsed * 1000, args.rinks * args.events / elapsed, baseline / elapsed))
+        outbox.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# milisekundy, s rezervou pro pomalejsi VM
+BUDGETS = {
+    'hockey_calendar_reader': 400,
+    'matches_times': 400,
+    'outbox': 100,
+}
+# moduly, ktere se smi nacist az na ceste, ktera je potrebuje
+FORBIDDEN = ['icalendar', 'dateutil.rrule', 'dateutil.parser', 'smtplib', 'email.mime', 'sqlite3', 'subprocess']
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import {0}'.format(module)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    total = 0
+    imported = []
+    for line in result.stderr.splitlines():
+        matched = LINE.match(line)
+        if matched is None:
+            continue
+        imported.append(matched.group(4))
+        # cumulative casy modulu na nejvyssi urovni se neprekryvaji
+        if len(matched.group(3)) == 1:
+            total += int(matched.group(2))
+    return total / 1000, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fails when import time of the entry points exceeds the budget')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply all budgets, e.g. 2 on a slow machine')
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS.items():
+        elapsed = min(measure(module)[0] for _ in range(3))
+        imported = measure(module)[1]
+        unwanted = sorted({name for name in imported for forbidden in FORBIDDEN
+                           if name == forbidden or name.startswith(forbidden + '.')})
+        ok = elapsed <= budget * args.scale and not unwanted
+        failed = failed or not ok
+        print('{0:<24} {1:7.1f} ms (budget {2:.0f} ms) {3}{4}'.format(
+            module, elapsed, budget * args.scale, 'OK' if ok else 'FAIL',
+            ' - unexpected imports: ' + ', '.join(unwanted) if unwanted else ''
+        ))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
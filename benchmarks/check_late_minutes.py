@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Checks late_minutes() on the boundary calendar against the former implementation for the 2019/20 season.
+
+Every start time in 15 minute steps of every day is combined with several match lengths. The former function
+only knew the holidays of HOLIDAYS below, differences are allowed just on the eves of the holidays it missed.
+"""
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from boundaries import BOUNDARY_BEFORE_FREEDAY, BOUNDARY_BEFORE_WORKDAY, czech_holidays
+from matches_times import late_minutes
+
+SEASON_START = datetime.date(2019, 9, 1)
+SEASON_END = datetime.date(2020, 9, 1)
+STEP = datetime.timedelta(minutes=15)
+LENGTHS = [datetime.timedelta(minutes=minutes) for minutes in (60, 75, 90, 120, 150)]
+
+# seznam svatku drivejsi verze matches_times.py
+HOLIDAYS = [
+    datetime.date(2019, 9, 28),
+    datetime.date(2019, 10, 28),
+    datetime.date(2019, 11, 17),
+    datetime.date(2019, 12, 24),
+    datetime.date(2019, 12, 25),
+    datetime.date(2019, 12, 26),
+    datetime.date(2020, 1, 1)
+]
+
+
+def reference_late_minutes(start_time, end_time):
+    # drivejsi late_minutes() beze zmeny
+    second_day = end_time + datetime.timedelta(days=1)
+    boundary_before_freeday = BOUNDARY_BEFORE_FREEDAY
+    boundary_before_workday = BOUNDARY_BEFORE_WORKDAY
+
+    holiday_check = datetime.date(second_day.year, second_day.month, second_day.day) in HOLIDAYS
+    if second_day.weekday() in [5,6] or holiday_check:
+        boundary = datetime.datetime(end_time.year, end_time.month, end_time.day, boundary_before_freeday, 0, 0)
+    else:
+        boundary = datetime.datetime(end_time.year, end_time.month, end_time.day, boundary_before_workday, 0, 0)
+
+    if start_time.replace(tzinfo=None) > boundary:
+        boundary = datetime.datetime(end_time.year, end_time.month, end_time.day, start_time.hour, start_time.minute, start_time.second)
+
+    if boundary >= end_time.replace(tzinfo=None):
+        return 0
+    else:
+        return int((end_time.replace(tzinfo=None) - boundary).seconds / 60)
+
+
+def matches(start, end):
+    day = datetime.datetime.combine(start, datetime.time())
+    while day.date() < end:
+        start_time = day
+        while start_time.date() == day.date():
+            for length in LENGTHS:
+                yield start_time, start_time + length
+            start_time += STEP
+        day += datetime.timedelta(days=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='late_minutes() against its former implementation for 2019/20')
+    parser.parse_args()
+
+    pairs = list(matches(SEASON_START, SEASON_END))
+    begin = time.perf_counter()
+    expected = [reference_late_minutes(start_time, end_time) for start_time, end_time in pairs]
+    reference_time = time.perf_counter() - begin
+    begin = time.perf_counter()
+    actual = [late_minutes(start_time, end_time) for start_time, end_time in pairs]
+    lookup_time = time.perf_counter() - begin
+
+    # svatky, ktere drivejsi seznam neznal
+    missed = (czech_holidays(2019) | czech_holidays(2020)) - set(HOLIDAYS)
+    explained = unexplained = 0
+    for (start_time, end_time), old, new in zip(pairs, expected, actual):
+        if old == new:
+            continue
+        if (end_time + datetime.timedelta(days=1)).date() in missed:
+            explained += 1
+        else:
+            unexplained += 1
+            if unexplained <= 10:
+                print('  {0} - {1}: {2} != {3}'.format(start_time, end_time, new, old))
+
+    print('{0} matches: former {1:.0f} ms, boundary calendar {2:.0f} ms'.format(
+        len(pairs), reference_time * 1000, lookup_time * 1000))
+    print('differences on eves of holidays missing before ({0}): {1}'.format(
+        ', '.join(day.strftime('%d.%m.%Y') for day in sorted(missed) if SEASON_START <= day < SEASON_END), explained))
+    print('other differences: {0} {1}'.format(unexplained, 'OK' if not unexplained else 'MISMATCH'))
+
+    try:
+        import numpy as np
+    except ImportError:
+        print('NumPy is not installed, the vectorized variant is not checked')
+    else:
+        from team_stats import late_minutes as vectorized_late_minutes, wall_clock
+        start = np.array([wall_clock(start_time) for start_time, _ in pairs], dtype=np.int64)
+        end = np.array([wall_clock(end_time) for _, end_time in pairs], dtype=np.int64)
+        begin = time.perf_counter()
+        vectorized = vectorized_late_minutes(start, end)
+        vectorized_time = time.perf_counter() - begin
+        same = vectorized.tolist() == actual
+        unexplained += 0 if same else 1
+        print('vectorized {0:.1f} ms {1}'.format(vectorized_time * 1000, 'OK' if same else 'MISMATCH'))
+
+    sys.exit(1 if unexplained else 0)
+
+
+if __name__ == '__main__':
+    main()
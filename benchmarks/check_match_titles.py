@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Checks parse_match_title() of teams.py on titles with known results and times its regex against the former one.
+
+Hand-written titles cover digits in team names, the '!' mark and missing spaces; every title of the synthetic
+season must give a team of the generator on both sides.
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import hockey_calendar_reader as reader
+from synthetic import MISSPELLED, TEAMS, generate_calendar
+from teams import MATCH_TITLE, TeamRegistry, parse_match_title
+
+# regex drivejsi verze matches_times.py, jen pro porovnani rychlosti
+FORMER = re.compile(r'.*\d+(.*)\\(.*)\d\.liga')
+
+# nazev -> (cislo zapasu, domaci, hoste, liga), None pro udalosti, ktere nejsou zapasem
+TITLES = {
+    'LHL č. 12 Bystřec \\ Udánky 1.liga': (12, 'Bystřec', 'Udánky', 1),
+    'LHL č. 7 Bystřec! \\ Udánky 2.liga': (7, 'Bystřec', 'Udánky', 2),
+    'LHL č. 3 HC 1973 Bystřec \\ Udánky 1.liga': (3, 'HC 1973 Bystřec', 'Udánky', 1),
+    'LHL č. 3 Bystřec \\ HC 1973 Udánky 1.liga': (3, 'Bystřec', 'HC 1973 Udánky', 1),
+    'LHL č. 4 Bystřec \\ Sokol 2 1.liga': (4, 'Bystřec', 'Sokol 2', 1),
+    'LHL č. 5 Bystřec 2 \\ Udánky 2.liga': (5, 'Bystřec 2', 'Udánky', 2),
+    'LHL č.6 Bystřec\\Udánky1.liga': (6, 'Bystřec', 'Udánky', 1),
+    'LHL č. 8 LDM Lanškroun \\ Sloni D. Morava 1.liga': (8, 'LDM Lanškroun', 'Sloni D. Morava', 1),
+    'LHL 1.liga bez čísla zápasu': None,
+    'Veřejné bruslení': None,
+}
+
+
+def parsed(name):
+    title = parse_match_title(name)
+    return None if title is None else (title.number, title.home, title.guest, title.league)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='parse_match_title() on titles with known results')
+    parser.add_argument('--events', type=int, default=20000, help='Events in the synthetic calendar')
+    args = parser.parse_args()
+
+    failed = 0
+    for name, expected in TITLES.items():
+        actual = parsed(name)
+        if actual != expected:
+            failed += 1
+            print('  {0!r}: {1} != {2}'.format(name, actual, expected))
+
+    names = [event.name for event in reader.iter_calendar_events(generate_calendar('la', args.events))]
+    spellings = set(TEAMS) | set(MISSPELLED.values())
+    matches = [name for name in names if name.startswith('LHL')]
+    for name in matches:
+        actual = parsed(name)
+        if actual is None or actual[1] not in spellings or actual[2] not in spellings:
+            failed += 1
+            if failed <= 10:
+                print('  {0!r}: {1}'.format(name, actual))
+
+    begin = time.perf_counter()
+    for name in names:
+        FORMER.match(name)
+    former_time = time.perf_counter() - begin
+    begin = time.perf_counter()
+    for name in names:
+        MATCH_TITLE.match(name)
+    anchored_time = time.perf_counter() - begin
+
+    # vsechny tymy synteticke sezony musi byt v teams.ini
+    registry = TeamRegistry.load()
+    for name in matches:
+        registry.match_ids(name)
+    unknown = sorted(registry.unknown)
+
+    print('{0} titles: former regex {1:.1f} ms, MATCH_TITLE {2:.1f} ms'.format(
+        len(names), former_time * 1000, anchored_time * 1000))
+    print('wrong results: {0} {1}'.format(failed, 'OK' if not failed else 'MISMATCH'))
+    print('unknown spellings of the synthetic season: {0} {1}'.format(
+        ', '.join(unknown) or 'none', 'OK' if not unknown else 'MISSING IN teams.ini'))
+
+    sys.exit(1 if failed or unknown else 0)
+
+
+if __name__ == '__main__':
+    main()
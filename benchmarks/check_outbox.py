@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Checks that Outbox.drain() retries a notification only for the recipients that did not get it.
+
+A small SMTP server refuses one recipient in the first drain and accepts everybody in the second. In digest and
+in per-notification mode the second drain must reach only the refused recipient, and a notification updated in
+between must go to all recipients again.
+"""
+import argparse
+import socketserver
+import sys
+import tempfile
+import threading
+from email import message_from_string, policy
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mailer import DIGEST_SUBJECT, MailDispatcher
+from outbox import Outbox
+
+RECIPIENTS = ['a@example.com', 'b@example.com', 'c@example.com']
+REFUSED = 'b@example.com'
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for smtplib without TLS and login."""
+
+    def reply(self, line):
+        self.wfile.write('{0}\r\n'.format(line).encode())
+
+    def handle(self):
+        recipients = []
+        self.reply('220 stand-in')
+        while True:
+            line = self.rfile.readline().decode().rstrip('\r\n')
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 stand-in')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 ok')
+            elif command == 'RCPT':
+                recipient = line.split(':', 1)[1].strip().strip('<>')
+                if recipient in self.server.refused:
+                    self.reply('550 no such user')
+                else:
+                    recipients.append(recipient)
+                    self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go on')
+                data = []
+                while True:
+                    line = self.rfile.readline().decode()
+                    if line.rstrip('\r\n') == '.':
+                        break
+                    data.append(line)
+                message = message_from_string(''.join(data), policy=policy.default)
+                self.server.received.append((tuple(recipients), message['Subject']))
+                self.reply('250 queued')
+            elif command == 'RSET':
+                recipients = []
+                self.reply('250 ok')
+            else:
+                self.reply('250 ok')
+
+
+class SmtpStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpHandler)
+        self.refused = set()
+        self.received = []
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def drain(outbox, server, digest):
+    dispatcher = MailDispatcher('reader@example.com', RECIPIENTS, '127.0.0.1', server.server_address[1],
+                                starttls=False, digest=digest)
+    start = len(server.received)
+    sent = outbox.drain(dispatcher)
+    # dalsi pokus hned, bez cekani na backoff
+    with outbox.connection:
+        outbox.connection.execute('UPDATE outbox SET next_attempt = 0 WHERE sent IS NULL')
+    return sent, server.received[start:]
+
+
+def reached(received):
+    return sorted(recipient for recipients, _ in received for recipient in recipients)
+
+
+def run(server, work_dir, digest, notifications):
+    outbox = Outbox('{0}/outbox-{1}.sqlite'.format(work_dir, 'digest' if digest else 'single'))
+    for i in range(notifications):
+        outbox.put('Změna {0}'.format(i), '<p>obsah {0}</p>'.format(i), 'key-{0}'.format(i))
+
+    results = []
+    server.refused = {REFUSED}
+    sent, received = drain(outbox, server, digest)
+    others = sorted(RECIPIENTS * (1 if digest else notifications))
+    others = [recipient for recipient in others if recipient != REFUSED]
+    results.append(('refused ' + REFUSED, sent == 0 and reached(received) == others, sent, received))
+
+    # zmeneny obsah castecne dorucene notifikace dostanou znovu vsichni
+    outbox.put('Změna 0', '<p>nový obsah 0</p>', 'key-0')
+    server.refused = set()
+    sent, received = drain(outbox, server, digest)
+    # digest: kazdy jeden email (REFUSED se vsemi notifikacemi), jinak zmenena vsem a ostatni jen REFUSED
+    expected = RECIPIENTS if digest else RECIPIENTS + [REFUSED] * (notifications - 1)
+    ok = sent == notifications and reached(received) == sorted(expected)
+    if digest:
+        ok = ok and all(subject == DIGEST_SUBJECT.format(notifications if recipients == (REFUSED,) else 1)
+                        for recipients, subject in received)
+    results.append(('retry', ok, sent, received))
+
+    sent, received = drain(outbox, server, digest)
+    results.append(('nothing left', sent == 0 and not received and outbox.pending_count() == 0, sent, received))
+    outbox.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-recipient retries of the outbox against an SMTP stand-in')
+    parser.add_argument('--notifications', type=int, default=3)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory(prefix='hockey-outbox-') as work_dir, SmtpStandIn() as server:
+        for digest in (True, False):
+            for label, ok, sent, received in run(server, work_dir, digest, args.notifications):
+                failed = failed or not ok
+                print('  {0:<7} {1:<20} {2} sent, {3} emails to {4} {5}'.format(
+                    'digest' if digest else 'single', label, sent, len(received),
+                    ', '.join(reached(received)) or 'nobody', 'OK' if ok else 'MISMATCH'))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Checks the incremental sync of calendar_api against a recorded sync replayed by the stand-in.
+
+The recording starts with a synthetic calendar and continues with delta pages of changed, cancelled and added
+events and a 410 Gone in the middle. After every round the events kept by sync_events() must equal the calendar
+of the stand-in, the 410 must lead to one full sync and the other rounds must ask only for the delta. The calendar
+begins in the past: events that ended before SYNC_KEEP_PAST must not be kept, and an empty delta must not rewrite
+the saved state.
+"""
+import argparse
+import copy
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import calendar_api
+from date_parsing import parse_event_time
+from events import to_epoch
+from stand_in import GONE, CalendarStandIn, load_recording
+from synthetic import generate_calendar, rfc3339
+
+CALENDAR_ID = 'halabmlan@gmail.com'
+# dny, o ktere kalendar zacina v minulosti
+PAST_DAYS = 5
+# GONE uprostred: predchozi token vyprsel, nasleduje plna synchronizace
+TIMELINE = ['delta', 'delta', [], GONE, 'delta']
+
+
+def record_delta(items, round, ratio, rnd):
+    """Changed, cancelled and added items of one round, as a delta page of the API lists them."""
+    updated = rfc3339(datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(days=round))
+    live = [item for item in items if item['status'] != 'cancelled' and 'summary' in item]
+    changed = max(1, int(len(live) * ratio))
+    delta = []
+    for item in rnd.sample(live, changed * 2):
+        if len(delta) < changed:
+            delta.append(dict(item, summary='{0} (změna {1})'.format(item['summary'], round), updated=updated))
+        else:
+            delta.append({'kind': 'calendar#event', 'id': item['id'], 'status': 'cancelled'})
+    for i in range(changed):
+        delta.append(dict(rnd.choice(live), id='r{0}added{1:05d}'.format(round, i), updated=updated))
+    return delta
+
+
+def apply(items, delta):
+    merged = {item['id']: item for item in items}
+    merged.update((item['id'], item) for item in delta)
+    return list(merged.values())
+
+
+def record(items, ratio, seed):
+    rnd = random.Random(seed)
+    current = items
+    deltas = []
+    for round, entry in enumerate(TIMELINE):
+        if entry == 'delta':
+            entry = record_delta(current, round, ratio, rnd)
+            current = apply(current, entry)
+        deltas.append(entry)
+    return deltas
+
+
+def visible(items, cutoff):
+    return sorted((item['id'], item.get('summary'), item['updated']) for item in items
+                  if item['status'] != 'cancelled' and to_epoch(parse_event_time(item['end'])) >= cutoff)
+
+
+def modified(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental sync against a replayed recording')
+    parser.add_argument('--events', type=int, default=3000, help='Events in the recorded calendar')
+    parser.add_argument('--ratio', type=float, default=0.02, help='Share of events changed by one delta')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = datetime.date.today() - datetime.timedelta(days=PAST_DAYS)
+    items = generate_calendar('la', args.events, args.seed, start=start)
+    with tempfile.TemporaryDirectory(prefix='hockey-sync-') as work_dir:
+        recording_path = '{0}/recording.json'.format(work_dir)
+        with open(recording_path, 'w', encoding='utf-8') as f:
+            json.dump({'calendars': {CALENDAR_ID: items}, 'deltas': {CALENDAR_ID: record(items, args.ratio, args.seed)}},
+                      f, ensure_ascii=False)
+        calendars, deltas = load_recording(recording_path)
+        expected = copy.deepcopy(calendars[CALENDAR_ID])
+
+        failed = False
+        state_file = '{0}/sync.json'.format(work_dir)
+        with CalendarStandIn(calendars, deltas=deltas) as server:
+            # kolo 0 je prvni plna synchronizace, kolo i > 0 prehraje zaznam i - 1
+            for round in range(len(TIMELINE) + 2):
+                entry = TIMELINE[round - 1] if 0 < round <= len(TIMELINE) else None
+                if 0 < round <= len(TIMELINE) and entry != GONE:
+                    expected = apply(expected, deltas[CALENDAR_ID][round - 1])
+
+                first = len(server.requests)
+                saved = modified(state_file)
+                cutoff = time.time() - calendar_api.SYNC_KEEP_PAST
+                synced = calendar_api.sync_events(CALENDAR_ID, 'key', state_file, api_url=server.url)
+                queries = [query for _, query in server.requests[first:]]
+                full = sum('syncToken' not in query and 'pageToken' not in query for query in queries)
+                with open(state_file, encoding='utf-8') as f:
+                    stored = list(json.load(f)['items'].values())
+
+                # skoncene udalosti nesmi zustat ani v pameti, ani v ulozenem stavu
+                ok = visible(synced, 0) == visible(expected, cutoff) and visible(stored, 0) == visible(synced, 0)
+                # plna synchronizace jen na zacatku a po 410
+                ok = ok and full == (1 if round == 0 or entry == GONE else 0)
+                # prazdna delta stav neprepisuje, ostatni kola ano
+                rewritten = modified(state_file) != saved
+                ok = ok and rewritten == (entry != [] and round <= len(TIMELINE))
+                failed = failed or not ok
+                label = 'full sync' if round == 0 else '410 gone' if entry == GONE else 'delta'
+                print('  round {0} {1:<10} {2:3} requests, {3:2} full, {4:5} of {5} events, {6} {7}'.format(
+                    round, label, len(queries), full, len(synced), len(visible(expected, 0)),
+                    'saved' if rewritten else 'not saved', 'OK' if ok else 'MISMATCH'))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
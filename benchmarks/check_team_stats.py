@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Checks that the NumPy statistics of team_stats.py match matches_times.aggregate_teams() and times both."""
+import argparse
+import datetime
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+if importlib.util.find_spec('numpy') is None:
+    sys.exit('NumPy is not installed, the vectorized statistics are not available')
+
+import hockey_calendar_reader as reader
+from matches_times import aggregate_teams, is_league_match, print_to_text_file, season_teams
+from synthetic import generate_calendar
+from team_stats import MatchArrays, aggregate_teams_vectorized, teams_from_arrays, wall_clock
+
+# zacatek sezony 2019/20, data obsahuji svatky i Velikonoce
+START = datetime.date(2019, 8, 25)
+SIZES = [10000, 50000]
+
+
+class TextCollector:
+    """Stands in for OutputPublisher, keeps the text output in memory."""
+
+    def __init__(self):
+        self.files = {}
+
+    def text(self, name, content):
+        self.files[name] = content
+
+
+def rows(teams):
+    collector = TextCollector()
+    print_to_text_file(teams, collector, 'teams_dates.txt')
+    return collector.files['teams_dates.txt']
+
+
+def measure(func, *args):
+    begin = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - begin) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parity check and timing of team_stats against matches_times')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Events in the synthetic calendar')
+    args = parser.parse_args()
+
+    failed = False
+    for size in args.sizes:
+        events = [event for event in reader.iter_calendar_events(generate_calendar('la', size, start=START))
+                  if is_league_match(event)]
+        expected, loop_time = measure(aggregate_teams, events)
+        actual, vectorized_time = measure(aggregate_teams_vectorized, events)
+        matches, build_time = measure(MatchArrays.from_events, events)
+        _, arrays_time = measure(teams_from_arrays, matches)
+
+        ok = list(expected.items()) == list(actual.items()) and rows(expected) == rows(actual)
+        ok = ok and list(season_teams(events).items()) == list(expected.items())
+
+        # jednotlive sezony vyberem z jednou sestavenych poli
+        season_start = datetime.datetime(START.year, 9, 1)
+        while ok and season_start < events[-1].start_time.replace(tzinfo=None):
+            season_end = season_start.replace(year=season_start.year + 1)
+            season = [event for event in events if season_start <= event.start_time.replace(tzinfo=None) < season_end]
+            mask = ((matches.start >= wall_clock(season_start)) & (matches.start < wall_clock(season_end)))
+            ok = rows(aggregate_teams(season)) == rows(teams_from_arrays(matches, mask))
+            season_start = season_end
+
+        failed = failed or not ok
+        print('{0:>6} matches: loop {1:7.1f} ms, numpy {2:7.1f} ms (arrays {3:.1f} ms + stats {4:.1f} ms) {5}'.format(
+            len(events), loop_time, vectorized_time, build_time, arrays_time, 'OK' if ok else 'MISMATCH'))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Local stand-in for the events.list endpoint of the Calendar API, serving fixed payloads or a recorded sync."""
+import argparse
+import datetime
+import hashlib
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hockey_calendar_reader import CALENDARS
+from synthetic import generate
+
+PAGE_SIZE = 250
+MAX_PAGE_SIZE = 2500
+SYNC_TOKEN = 'stand-in-sync'
+REPLAY_TOKEN = 'stand-in-replay-'
+# zaznam odpovedi 410 Gone v prehravane synchronizaci
+GONE = 'gone'
+ITEM_FIELDS = re.compile(r'items\(([^)]*)\)')
+
+
+def item_time(value):
+    if 'date' in value:
+        return datetime.datetime.fromisoformat(value['date']).replace(tzinfo=datetime.timezone.utc)
+    return datetime.datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+
+
+class CalendarHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlparse(self.path)
+        segments = [unquote(segment) for segment in parts.path.strip('/').split('/')]
+        if len(segments) != 3 or segments[0] != 'calendars' or segments[2] != 'events':
+            self.send_error(404)
+            return
+        items = self.server.calendars.get(segments[1])
+        if items is None:
+            self.send_error(404)
+            return
+
+        query = parse_qs(parts.query)
+        data, etag = self.server.page(segments[1], items, query)
+        if data is None:
+            self.send_error(410, 'Sync token is no longer valid')
+            return
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_json(data, etag)
+
+    def send_json(self, data, etag):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class CalendarStandIn(ThreadingHTTPServer):
+    """Serves {calendar_id: [items]} with pagination, sync tokens, ETags, timeMin/timeMax and the items(...) part
+    of fields.
+
+    orderBy is ignored, items are served in the given order. Cancelled items have no times and are left out
+    of queries with timeMin or timeMax. Pages are serialized once and cached, so the server adds as little
+    as possible to measured fetch times. A request with a syncToken gets an empty page, i.e. the calendar has not
+    changed since the last sync.
+
+    deltas replays a recorded sync of some calendars: {calendar_id: [changed items or GONE, ...]}. A client with
+    the token of entry k gets its items (cancelled ones included) and the token of entry k + 1, or 410 Gone for GONE;
+    served entries are applied to the calendar, so a full sync returns the changed events with the current token.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, calendars, host='127.0.0.1', port=0, deltas=None):
+        super().__init__((host, port), CalendarHandler)
+        self.calendars = calendars
+        self.deltas = deltas or {}
+        self.requests = []
+        self._replayed = {calendar_id: 0 for calendar_id in self.deltas}
+        self._pages = {}
+        self._bounds = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://{0}:{1}'.format(*self.server_address[:2])
+
+    def page(self, calendar_id, items, query):
+        with self._lock:
+            self.requests.append((calendar_id, query))
+        if calendar_id in self.deltas and 'syncToken' in query:
+            return self.replay(calendar_id, query['syncToken'][0])
+        if 'syncToken' in query:
+            key = (calendar_id, 'sync')
+        else:
+            size = min(int(query.get('maxResults', [PAGE_SIZE])[0]), MAX_PAGE_SIZE)
+            offset = int(query.get('pageToken', ['0'])[0])
+            key = (calendar_id, size, offset, query.get('fields', [''])[0],
+                   query.get('timeMin', [None])[0], query.get('timeMax', [None])[0])
+
+        with self._lock:
+            data = self._pages.get(key)
+        if data is not None:
+            return data
+
+        if key[1] == 'sync':
+            body = {'kind': 'calendar#events', 'items': [], 'nextSyncToken': SYNC_TOKEN}
+        else:
+            if key[4] is not None or key[5] is not None:
+                items = self.in_range(calendar_id, items, key[4], key[5])
+            page_items = items[offset:offset + size]
+            fields = ITEM_FIELDS.search(key[3])
+            if fields is not None:
+                names = fields.group(1).split(',')
+                page_items = [{name: item[name] for name in names if name in item} for item in page_items]
+            body = {'kind': 'calendar#events', 'items': page_items}
+            if offset + size < len(items):
+                body['nextPageToken'] = str(offset + size)
+            elif calendar_id in self.deltas:
+                body['nextSyncToken'] = REPLAY_TOKEN + str(self._replayed[calendar_id])
+            else:
+                body['nextSyncToken'] = SYNC_TOKEN
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        page = data, '"{0}"'.format(hashlib.sha1(data).hexdigest())
+        with self._lock:
+            self._pages[key] = page
+        return page
+
+    def replay(self, calendar_id, token):
+        """Recorded delta page for token, (None, None) for 410 Gone."""
+        timeline = self.deltas[calendar_id]
+        with self._lock:
+            replayed = self._replayed[calendar_id]
+            position = int(token[len(REPLAY_TOKEN):]) if token.startswith(REPLAY_TOKEN) else -1
+            if not 0 <= position <= replayed:
+                return None, None
+            if position == len(timeline):
+                changed, next_position = [], position
+            else:
+                changed, next_position = timeline[position], position + 1
+                if position == replayed:
+                    self.apply(calendar_id, changed)
+            if changed == GONE:
+                return None, None
+
+        body = {'kind': 'calendar#events', 'items': changed, 'nextSyncToken': REPLAY_TOKEN + str(next_position)}
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        return data, '"{0}"'.format(hashlib.sha1(data).hexdigest())
+
+    def apply(self, calendar_id, changed):
+        # zmeny se propisi do kalendare, plna synchronizace pak vrati aktualni stav
+        self._replayed[calendar_id] += 1
+        if changed == GONE:
+            return
+        items = self.calendars[calendar_id]
+        index = {item['id']: i for i, item in enumerate(items)}
+        for item in changed:
+            if item['id'] in index:
+                items[index[item['id']]] = item
+            else:
+                index[item['id']] = len(items)
+                items.append(item)
+        self._pages = {key: page for key, page in self._pages.items() if key[0] != calendar_id}
+        self._bounds.pop(calendar_id, None)
+
+    def in_range(self, calendar_id, items, time_min, time_max):
+        # jako API: konec po timeMin a zacatek pred timeMax
+        with self._lock:
+            bounds = self._bounds.get(calendar_id)
+        if bounds is None:
+            bounds = [(item_time(item['start']), item_time(item['end'])) if 'start' in item else None
+                      for item in items]
+            with self._lock:
+                self._bounds[calendar_id] = bounds
+        low = item_time({'dateTime': time_min}) if time_min is not None else None
+        high = item_time({'dateTime': time_max}) if time_max is not None else None
+        return [item for item, times in zip(items, bounds) if times is not None
+                and (low is None or times[1] > low) and (high is None or times[0] < high)]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
+
+
+def load_recording(path):
+    """(calendars, deltas) of CalendarStandIn from a JSON file {"calendars": {...}, "deltas": {...}}."""
+    with open(path, encoding='utf-8') as f:
+        recording = json.load(f)
+    return recording['calendars'], recording.get('deltas', {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serves synthetic calendars, set API_URL in [CALENDAR] to its address')
+    parser.add_argument('--events', type=int, default=10000, help='Number of events in all calendars')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--replay', metavar='PATH', help='Serve calendars and sync deltas recorded in a JSON file')
+    args = parser.parse_args()
+
+    if args.replay:
+        calendars, deltas = load_recording(args.replay)
+        server = CalendarStandIn(calendars, port=args.port, deltas=deltas)
+        print('Replaying {0} at {1}'.format(args.replay, server.url))
+    else:
+        generated = generate(args.events, args.seed)
+        server = CalendarStandIn({CALENDARS[rink]: items for rink, items in generated.items()}, port=args.port)
+        print('Serving {0} events at {1}'.format(args.events, server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Synthetic Calendar API payloads that look like the Lanškroun and Česká Třebová rink calendars."""
+import datetime
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from events import LOCAL_TZ
+
+SLOT = datetime.timedelta(minutes=75)
+DAY_START = datetime.time(6, 0)
+DAY_END = datetime.time(23, 30)
+
+TEAMS = [
+    'Bystřec', 'Udánky', 'Snakes D.Dobrouč', 'Horní Třešňovec', 'Horní Čermná', 'Slámožrouti Kunvald',
+    'Sokol Klášterec', 'Sloni D. Morava', 'Wild Band Zábřeh', 'LDM Lanškroun', 'Rudolfov', 'Žichlínek',
+]
+# nekonzistentni nazvy, jak je zapisuje spravce kalendare
+MISSPELLED = {'Udánky': 'Trnávka', 'Snakes D.Dobrouč': 'Snakes', 'Horní Třešňovec': 'H.Třešňovec',
+              'Horní Čermná': 'Horní Čerrmná', 'Sloni D. Morava': 'Sloni'}
+
+# (podil, druh udalosti)
+MIX = [
+    (0.35, 'match'),
+    (0.15, 'free'),
+    (0.10, 'skating'),
+    (0.08, 'drop_in'),
+    (0.22, 'booking'),
+    (0.02, 'no_summary'),
+    (0.05, 'cancelled'),
+    (0.03, 'all_day'),
+]
+BOOKINGS = ['Hrdina', 'Bystřec trénink', 'Bys', 'HC Lanškroun mládež', 'ZŠ Lanškroun', 'Krasobruslení', 'Hrdina + Bystřec']
+SKATING = {'la': 'volné bruslení', 'ct': 'VEŘEJNÉ BRUSLENÍ'}
+ALL_DAY = ['ZAVŘENO - úprava ledu', 'Turnaj mládeže', 'Mistrovství ČR - přípravky']
+ORGANIZER = {'la': 'halabmlan@gmail.com', 'ct': 'n7i0r6c4810701q9f4ffvpbjd8@group.calendar.google.com'}
+
+
+def rfc3339(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def match_name(rink, number, rnd):
+    home, guest = rnd.sample(TEAMS, 2)
+    if rnd.random() < 0.1:
+        guest = MISSPELLED.get(guest, guest)
+    if rink == 'ct':
+        return 'CHL {0} - {1}'.format(home, guest)
+    return 'LHL č. {0} {1}{2} \\ {3} {4}.liga'.format(number, home, '!' if rnd.random() < 0.05 else '', guest,
+                                                     rnd.choice([1, 1, 2]))
+
+
+def choose_kind(rnd):
+    value = rnd.random()
+    for share, kind in MIX:
+        if value < share:
+            return kind
+        value -= share
+    return MIX[-1][1]
+
+
+def generate_calendar(rink, size, seed=0, start=None):
+    """Return size raw API items of one rink ordered by day, beginning the day after start (default today)."""
+    rnd = random.Random('{0}-{1}'.format(rink, seed))
+    if start is None:
+        start = datetime.date.today()
+    day = start + datetime.timedelta(days=1)
+    slot_start = LOCAL_TZ.localize(datetime.datetime.combine(day, DAY_START))
+    created = datetime.datetime(2019, 8, 1, 10, 0, tzinfo=datetime.timezone.utc)
+
+    items = []
+    match_number = 0
+    while len(items) < size:
+        if slot_start.time() >= DAY_END:
+            day += datetime.timedelta(days=1)
+            slot_start = LOCAL_TZ.localize(datetime.datetime.combine(day, DAY_START))
+        # obcas mezera mezi rezervacemi, aby vznikl volny led
+        if rnd.random() < 0.1:
+            slot_start += SLOT
+            continue
+
+        i = len(items)
+        kind = choose_kind(rnd)
+        id = '{0}{1:07d}'.format(rink, i)
+        # pole, ktera API vraci bez projekce fields, skripty je nepouzivaji
+        item = {
+            'kind': 'calendar#event',
+            'etag': '"{0}"'.format(3150000000000000 + i),
+            'id': id,
+            'status': 'confirmed',
+            'htmlLink': 'https://www.google.com/calendar/event?eid={0}'.format(id),
+            'created': rfc3339(created + datetime.timedelta(minutes=i)),
+            'updated': rfc3339(created + datetime.timedelta(days=30, minutes=rnd.randrange(100000))),
+            'creator': {'email': ORGANIZER[rink]},
+            'organizer': {'email': ORGANIZER[rink], 'displayName': 'Zimní stadion', 'self': True},
+            'iCalUID': '{0}@google.com'.format(id),
+            'sequence': 0,
+            'reminders': {'useDefault': True},
+            'eventType': 'default',
+        }
+        if kind == 'cancelled':
+            # smazane udalosti prijdou jen s id a stavem
+            items.append({'kind': 'calendar#event', 'id': id, 'status': 'cancelled'})
+            continue
+        if kind == 'all_day':
+            item['summary'] = rnd.choice(ALL_DAY)
+            item['start'] = {'date': day.isoformat()}
+            item['end'] = {'date': (day + datetime.timedelta(days=1)).isoformat()}
+            items.append(item)
+            continue
+
+        end = slot_start + SLOT
+        item['start'] = {'dateTime': slot_start.isoformat()}
+        item['end'] = {'dateTime': LOCAL_TZ.normalize(end).isoformat()}
+        if kind == 'match':
+            match_number += 1
+            item['summary'] = match_name(rink, match_number, rnd)
+        elif kind == 'free':
+            item['summary'] = 'volno'
+        elif kind == 'skating':
+            item['summary'] = SKATING[rink]
+        elif kind == 'drop_in':
+            item['summary'] = 'hokej pro příchozí'
+        elif kind == 'booking':
+            item['summary'] = rnd.choice(BOOKINGS)
+        items.append(item)
+        slot_start = end
+
+    return items
+
+
+def mutate(items, ratio=0.05, seed=0):
+    """Copy of items with ratio of them updated, removed and added, as the calendar looks one poll later."""
+    rnd = random.Random(seed)
+    updated = rfc3339(datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+    changed = max(1, int(len(items) * ratio))
+    mutated = [dict(item) for item in items]
+    for i in rnd.sample(range(len(mutated)), changed):
+        if 'summary' in mutated[i]:
+            mutated[i]['summary'] += ' (změna)'
+            mutated[i]['updated'] = updated
+    removed = set(rnd.sample(range(len(mutated)), changed))
+    mutated = [item for i, item in enumerate(mutated) if i not in removed]
+    for i in range(changed):
+        added = dict(rnd.choice(items), id='added{0:07d}'.format(i))
+        if 'summary' in added:
+            mutated.append(added)
+    return mutated
+
+
+def generate(size, seed=0, start=None):
+    """Calendars of both rinks with size events in total, 60 % of them in Lanškroun."""
+    la_size = size * 3 // 5
+    return {
+        'la': generate_calendar('la', la_size, seed, start),
+        'ct': generate_calendar('ct', size - la_size, seed, start),
+    }
+
+
+if __name__ == '__main__':
+    import json
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    json.dump(generate(size), sys.stdout, ensure_ascii=False, indent=2)
@@ -0,0 +1,111 @@
+"""Late boundary of every day: matches ending after it count as late, see matches_times.late_minutes()."""
+import datetime
+
+# hodiny; hranice dne zavisi na tom, jestli je dalsi den volno
+BOUNDARY_BEFORE_FREEDAY = 23
+BOUNDARY_BEFORE_WORKDAY = 22
+DAY = 86400
+HOUR = 3600
+# dny pracovniho klidu (mesic, den), Velky patek a Velikonocni pondeli se pocitaji
+FIXED_HOLIDAYS = [(1, 1), (5, 1), (5, 8), (7, 5), (7, 6), (9, 28), (10, 28), (11, 17), (12, 24), (12, 25), (12, 26)]
+# Velky patek je svatkem od roku 2016
+GOOD_FRIDAY_SINCE = 2016
+# zvysit pri kazde zmene hranic nebo svatku, ulozene pozdni minuty se pak prepocitaji
+RULES_VERSION = 2
+
+
+def easter_sunday(year):
+    """Date of Easter Sunday in the Gregorian calendar (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def czech_holidays(year):
+    """Public holidays and other days off in Czechia in year."""
+    holidays = {datetime.date(year, month, day) for month, day in FIXED_HOLIDAYS}
+    easter = easter_sunday(year)
+    holidays.add(easter + datetime.timedelta(days=1))
+    if year >= GOOD_FRIDAY_SINCE:
+        holidays.add(easter - datetime.timedelta(days=2))
+    return holidays
+
+
+class BoundaryCalendar:
+    """Boundary hour of every day of the covered years, indexed by date ordinal.
+
+    23 before a weekend or holiday, 22 before a workday. Years are computed once, the first time a day
+    in them is looked up.
+    """
+
+    def __init__(self, holidays=czech_holidays):
+        self.holidays = holidays
+        self.first = None
+        self.hours = bytearray()
+
+    def cover(self, first_year, last_year):
+        """Precompute all days of first_year..last_year together with the years covered already."""
+        if self.first is not None:
+            first_year = min(first_year, datetime.date.fromordinal(self.first).year)
+            last_year = max(last_year, datetime.date.fromordinal(self.first + len(self.hours) - 1).year)
+        first = datetime.date(first_year, 1, 1).toordinal()
+        last = datetime.date(last_year, 12, 31).toordinal()
+        # 31.12. zavisi na 1.1. dalsiho roku
+        free_days = set()
+        for year in range(first_year, last_year + 2):
+            free_days.update(day.toordinal() for day in self.holidays(year))
+
+        hours = bytearray()
+        # ordinal 1 (1.1.1) bylo pondeli
+        for ordinal in range(first + 1, last + 2):
+            free = ordinal % 7 in (6, 0) or ordinal in free_days
+            hours.append(BOUNDARY_BEFORE_FREEDAY if free else BOUNDARY_BEFORE_WORKDAY)
+        self.first = first
+        self.hours = hours
+
+    def hour(self, ordinal):
+        """Boundary hour of the day with date ordinal."""
+        index = -1 if self.first is None else ordinal - self.first
+        if not 0 <= index < len(self.hours):
+            year = datetime.date.fromordinal(ordinal).year
+            self.cover(year, year)
+            index = ordinal - self.first
+        return self.hours[index]
+
+    def table(self, first_ordinal, last_ordinal):
+        """(ordinal of the first entry, boundary hours) covering both days, for batch lookups."""
+        self.hour(first_ordinal)
+        self.hour(last_ordinal)
+        return self.first, bytes(self.hours)
+
+    def late_minutes(self, start_time, end_time):
+        """Minutes of a match after the boundary of its last day, on the wall clock of the event."""
+        end_day = end_time.toordinal()
+        boundary = self.hour(end_day) * HOUR
+        end = end_time.hour * HOUR + end_time.minute * 60 + end_time.second
+        start = (start_time.toordinal() - end_day) * DAY + start_time.hour * HOUR + start_time.minute * 60 + \
+            start_time.second
+        # zapas zacal az po hranici, pocita se od jeho zacatku
+        if start > boundary:
+            boundary = start % DAY
+        if boundary >= end:
+            return 0
+        return (end - boundary) // 60
+
+
+_calendar = None
+
+
+def get_boundary_calendar():
+    global _calendar
+    if _calendar is None:
+        _calendar = BoundaryCalendar()
+    return _calendar
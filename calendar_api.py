@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from date_parsing import parse_event_time
+from events import to_epoch
+from instrumentation import count
+
+API_URL = 'https://www.googleapis.com/calendar/v3'
+
+# (connect, read) v sekundach
+TIMEOUT = (5, 30)
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+POOL_SIZE = 10
+# jen pole, ktera skripty pouzivaji; bez popisu, ucastniku, odkazu a pripominek
+EVENT_FIELDS = 'items(id,status,summary,start,end,created,updated),nextPageToken,nextSyncToken'
+# sekundy, nepouzivane odpovedi v cache se po te dobe mazou
+CACHE_MAX_AGE = 2 * 24 * 60 * 60
+# dekodovane stranky drzene v pameti, starsi se zahazuji
+MEMORY_PAGES = 64
+
+_session = None
+_session_lock = threading.Lock()
+# sekundy; udalosti skoncene drive se z ulozene synchronizace mazou, pripadna pozdejsi zmena se vrati v delte
+SYNC_KEEP_PAST = 24 * 60 * 60
+
+# stav synchronizace drzeny v pameti mezi behy v rezimu daemon
+_sync_states = {}
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+def events_url(calendar_id, api_url=API_URL):
+    return '{0}/calendars/{1}/events'.format(api_url.rstrip('/'), calendar_id)
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=['GET'],
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            _session = requests.Session()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def get(url, params, headers=None):
+    response = get_session().get(url=url, params=params, headers=headers, timeout=TIMEOUT)
+    count('fetch', bytes_fetched=len(response.content))
+    return response
+
+
+def check_response(response, url):
+    if response.status_code == 410:
+        raise SyncTokenExpired(url)
+    response.raise_for_status()
+
+
+class ResponseCache:
+    """Response bodies on disk, revalidated with If-None-Match, so an unchanged page costs a 304 without a body.
+
+    Entries are keyed by url and query without the API key. Every hit refreshes the mtime of its entry
+    and prune() removes entries not used for max_age seconds, e.g. those of older timeMin values.
+    Decoded pages are also kept in memory, so in daemon mode a 304 needs no JSON decoding at all;
+    returned pages are shared and must not be modified. One cache can be used from several threads.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def path(self, url, params):
+        query = sorted((key, str(value)) for key, value in params.items() if key != 'key')
+        digest = hashlib.sha256(json.dumps([url, query]).encode('utf-8')).hexdigest()
+        return self.directory / '{0}.page'.format(digest)
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                etag = f.readline().rstrip(b'\n').decode('utf-8')
+                return etag, f.read()
+        except OSError:
+            return None
+
+    def _write(self, path, etag, body):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # soubezne vlakna i behy nesmi zapisovat do stejneho docasneho souboru
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(etag.encode('utf-8') + b'\n')
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    def get_page(self, url, params):
+        path = self.path(url, params)
+        cached = self._read(path)
+        headers = {'If-None-Match': cached[0]} if cached is not None else None
+
+        response = get(url, params, headers)
+        if response.status_code == 304 and cached is not None:
+            count('fetch', not_modified=1)
+            os.utime(path)
+            with self._lock:
+                etag, page = self._pages.get(path, (None, None))
+            if etag != cached[0]:
+                page = json.loads(cached[1])
+                self._remember(path, cached[0], page)
+            return page
+
+        check_response(response, url)
+        page = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            self._write(path, etag, response.content)
+            self._remember(path, etag, page)
+        return page
+
+    def _remember(self, path, etag, page):
+        # vlakna fetch_concurrently sdileji jednu cache
+        with self._lock:
+            self._pages.pop(path, None)
+            self._pages[path] = etag, page
+            while len(self._pages) > MEMORY_PAGES:
+                del self._pages[next(iter(self._pages))]
+
+    def prune(self, max_age=CACHE_MAX_AGE):
+        if not self.directory.is_dir():
+            return 0
+        removed = 0
+        limit = time.time() - max_age
+        for path in self.directory.iterdir():
+            try:
+                if path.stat().st_mtime < limit:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+def fetch_concurrently(fetch, calendar_ids, max_workers=POOL_SIZE):
+    """Call fetch(calendar_id) for all calendars at once, at most max_workers at a time.
+
+    Results keep the order of calendar_ids.
+    """
+    if not calendar_ids:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(len(calendar_ids), max_workers)) as executor:
+        return list(executor.map(fetch, calendar_ids))
+
+
+def load_sync_state(state_file):
+    if not Path(state_file).is_file():
+        return None
+
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        # poskozeny stav -> plna synchronizace
+        return None
+
+
+def save_sync_state(state_file, state):
+    Path(state_file).parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = '{0}.tmp'.format(state_file)
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_file, state_file)
+
+
+def iter_pages(url, params, cache=None):
+    """Yield response pages one by one, following nextPageToken. Pages are revalidated through cache if given."""
+    params = dict(params)
+    while True:
+        if cache is not None:
+            page = cache.get_page(url, params)
+        else:
+            response = get(url, params)
+            check_response(response, url)
+            page = response.json()
+        yield page
+
+        if 'nextPageToken' not in page:
+            return
+        params['pageToken'] = page['nextPageToken']
+
+
+def iter_items(url, params, cache=None):
+    for page in iter_pages(url, params, cache):
+        yield from page.get('items', [])
+
+
+def merge_sync_pages(cached, calendar_id, api_key, sync_token=None, api_url=API_URL):
+    """Merge changed and cancelled items into cached, return (nextSyncToken, number of received items)."""
+    # syncToken nelze kombinovat s timeMin ani orderBy, filtruje a radi se az lokalne
+    params = {
+        'key': api_key,
+        'singleEvents': 'True',
+        'maxResults': 2500,
+        'fields': EVENT_FIELDS
+    }
+    if sync_token is not None:
+        params['syncToken'] = sync_token
+
+    next_sync_token = None
+    received = 0
+    for page in iter_pages(events_url(calendar_id, api_url), params):
+        received += len(page.get('items', []))
+        for item in page.get('items', []):
+            if item.get('status') == 'cancelled':
+                cached.pop(item['id'], None)
+            else:
+                cached[item['id']] = item
+        next_sync_token = page.get('nextSyncToken')
+
+    return next_sync_token, received
+
+
+def prune_sync_items(cached, now=None):
+    """Drop cached items that ended more than SYNC_KEEP_PAST seconds before now, return how many were dropped."""
+    # plna synchronizace nema timeMin, bez orezani by stav obsahoval celou historii kalendare
+    cutoff = (time.time() if now is None else now) - SYNC_KEEP_PAST
+    ended = [id for id, item in cached.items() if 'end' in item and to_epoch(parse_event_time(item['end'])) < cutoff]
+    for id in ended:
+        del cached[id]
+    return len(ended)
+
+
+def sync_events(calendar_id, api_key, state_file, api_url=API_URL):
+    """Return raw event items of a calendar, downloading only changes since the last sync."""
+    state = _sync_states.get(state_file)
+    if state is None:
+        state = load_sync_state(state_file)
+
+    changed = 0
+    if state is not None and state.get('sync_token'):
+        try:
+            state['sync_token'], changed = merge_sync_pages(
+                state['items'], calendar_id, api_key, state['sync_token'], api_url)
+        except SyncTokenExpired:
+            state = None
+    else:
+        state = None
+
+    full_sync = state is None
+    if full_sync:
+        state = {'calendar_id': calendar_id, 'sync_token': None, 'items': {}}
+        state['sync_token'], changed = merge_sync_pages(state['items'], calendar_id, api_key, api_url=api_url)
+
+    changed += prune_sync_items(state['items'])
+    # prazdna delta nic nemeni; token ulozeny minule zustava platny a vrati tutez (prazdnou) zmenu
+    if full_sync or changed:
+        save_sync_state(state_file, state)
+    _sync_states[state_file] = state
+
+    return list(state['items'].values())
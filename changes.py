@@ -0,0 +1,71 @@
+from events import to_epoch
+
+ADDED = 'added'
+REMOVED = 'removed'
+UPDATED = 'updated'
+
+
+def fingerprint(event):
+    # cele sekundy, starsi textove snapshoty nemaji mikrosekundy ani casove zony
+    return (event.name, to_epoch(event.start_time), to_epoch(event.end_time), to_epoch(event.updated))
+
+
+class Change:
+    __slots__ = ('kind', 'event', 'old_event')
+
+    def __init__(self, kind, event, old_event=None):
+        self.kind = kind
+        self.event = event
+        self.old_event = old_event
+
+    def __repr__(self):
+        return 'Change({0!r}, {1!r})'.format(self.kind, self.event)
+
+
+class ChangeSet:
+    __slots__ = ('added', 'removed', 'updated', 'unchanged')
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.updated = []
+        self.unchanged = 0
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.updated)
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.updated)
+
+    def __iter__(self):
+        yield from self.added
+        yield from self.removed
+        yield from self.updated
+
+    def __repr__(self):
+        return 'ChangeSet(added={0}, removed={1}, updated={2}, unchanged={3})'.format(
+            len(self.added), len(self.removed), len(self.updated), self.unchanged
+        )
+
+
+def diff_events(old_events, new_events):
+    """Classify events as added, removed, updated or unchanged in O(n) using id -> event maps."""
+    old_by_id = {event.id: event for event in old_events}
+    new_ids = set()
+    changes = ChangeSet()
+
+    for event in new_events:
+        new_ids.add(event.id)
+        old_event = old_by_id.get(event.id)
+        if old_event is None:
+            changes.added.append(Change(ADDED, event))
+        elif fingerprint(old_event) != fingerprint(event):
+            changes.updated.append(Change(UPDATED, event, old_event))
+        else:
+            changes.unchanged += 1
+
+    for id, old_event in old_by_id.items():
+        if id not in new_ids:
+            changes.removed.append(Change(REMOVED, old_event, old_event))
+
+    return changes
@@ -0,0 +1,49 @@
+import datetime
+from functools import lru_cache
+
+CACHE_SIZE = 8192
+
+
+def parse(value, **kwargs):
+    # dateutil je pomaly i na import, nacita se jen pro neocekavane formaty
+    from dateutil.parser import parse as dateutil_parse
+    return dateutil_parse(value, **kwargs)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_rfc3339(value):
+    """Parse dateTime/created/updated values of the Calendar API, e.g. 2019-09-28T10:00:00+02:00 or ...T08:00:00.000Z."""
+    try:
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return parse(value)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(value):
+    """Parse all-day event date, e.g. 2019-09-28, to naive midnight datetime."""
+    try:
+        return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time())
+    except ValueError:
+        return parse(value)
+
+
+def parse_event_time(value):
+    # start/end udalosti ma bud dateTime, nebo date (celodenni)
+    if 'dateTime' in value:
+        return parse_rfc3339(value['dateTime'])
+    return parse_date(value['date'])
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_czech_datetime(value):
+    """Parse dates written as '%A %d.%m.%Y %H:%M:%S' in czech locale, the weekday name is ignored."""
+    splitted = value.split(' ')
+    try:
+        day, month, year = splitted[1].split('.')
+        hour, minute, second = splitted[2].split(':')
+        return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+    except (IndexError, ValueError):
+        return parse(splitted[1] + ' ' + splitted[2], dayfirst=True)
@@ -0,0 +1,161 @@
+import datetime
+import sys
+from array import array
+
+import pytz
+
+LOCAL_TZ = pytz.timezone('Europe/Prague')
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class Event:
+    __slots__ = ('name', 'start_time', 'end_time', 'created', 'updated', 'id')
+
+    def __init__(self, name, start_time, end_time, created, updated, id):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'start_time', start_time)
+        object.__setattr__(self, 'end_time', end_time)
+        object.__setattr__(self, 'created', created)
+        object.__setattr__(self, 'updated', updated)
+        object.__setattr__(self, 'id', id)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('Event is immutable, use replace()')
+
+    def __delattr__(self, key):
+        raise AttributeError('Event is immutable')
+
+    def __eq__(self, other):
+        if not isinstance(other, Event):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __reduce__(self):
+        # vychozi pickle by nastavoval sloty pres __setattr__
+        return Event, tuple(getattr(self, key) for key in self.__slots__)
+
+    def __repr__(self):
+        return 'Event(id={0!r}, name={1!r}, start_time={2!r})'.format(self.id, self.name, self.start_time)
+
+    def __str__(self):
+        return (
+            f"Event:\n"
+            f"  Name: {self.name}\n"
+            f"  Start Time: {self.start_time}\n"
+            f"  End Time: {self.end_time}\n"
+            f"  Created: {self.created}\n"
+            f"  Updated: {self.updated}\n"
+            f"  ID: {self.id}"
+        )
+
+    def replace(self, **changes):
+        values = {key: getattr(self, key) for key in self.__slots__}
+        values.update(changes)
+        return Event(**values)
+
+
+def to_aware(value):
+    # celodenni udalosti (date) nemaji casovou zonu, berou se v mistnim case
+    if value.tzinfo is None:
+        return LOCAL_TZ.localize(value)
+    return value
+
+
+def to_epoch(value):
+    return int(to_aware(value).timestamp())
+
+
+def from_epoch(value, tz=LOCAL_TZ):
+    return datetime.datetime.fromtimestamp(value, tz)
+
+
+def epoch_and_offset(value):
+    """(to_epoch(value), UTC offset of value in seconds), all-day events are taken in local time."""
+    value = to_aware(value)
+    return int(value.timestamp()), int(value.utcoffset().total_seconds())
+
+
+def to_microseconds(value):
+    """Microseconds since EPOCH as stored by snapshots and history, naive values count as UTC wall clock."""
+    # bez lokalizace, aby se datum celodenni udalosti vratil beze zmeny i po zmene LOCAL_TZ
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_microseconds(value):
+    return EPOCH + value * MICROSECOND
+
+
+class EventBatch:
+    """Columnar form of many events: times as epoch seconds in arrays, names in an interned string table.
+
+    start_offset and end_offset keep the UTC offsets of start and end, so start + start_offset is the wall clock
+    time of the event (team_stats.py). Events rebuilt by event() carry these offsets as fixed time zones.
+    """
+
+    __slots__ = ('ids', 'names', 'name_codes', 'start', 'end', 'start_offset', 'end_offset', 'created', 'updated',
+                 '_name_index')
+
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.name_codes = array('I')
+        self.start = array('q')
+        self.end = array('q')
+        self.start_offset = array('i')
+        self.end_offset = array('i')
+        self.created = array('q')
+        self.updated = array('q')
+        self._name_index = {}
+
+    @classmethod
+    def from_events(cls, events):
+        batch = cls()
+        for event in events:
+            batch.append(event)
+        return batch
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self.event(i)
+
+    def name_code(self, name):
+        code = self._name_index.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(sys.intern(name))
+            self._name_index[name] = code
+        return code
+
+    def append(self, event):
+        self.ids.append(event.id)
+        self.name_codes.append(self.name_code(event.name))
+        start, start_offset = epoch_and_offset(event.start_time)
+        end, end_offset = epoch_and_offset(event.end_time)
+        self.start.append(start)
+        self.end.append(end)
+        self.start_offset.append(start_offset)
+        self.end_offset.append(end_offset)
+        self.created.append(to_epoch(event.created))
+        self.updated.append(to_epoch(event.updated))
+
+    def event(self, i):
+        return Event(
+            name=self.names[self.name_codes[i]],
+            start_time=from_epoch(self.start[i], datetime.timezone(datetime.timedelta(seconds=self.start_offset[i]))),
+            end_time=from_epoch(self.end[i], datetime.timezone(datetime.timedelta(seconds=self.end_offset[i]))),
+            created=from_epoch(self.created[i], datetime.timezone.utc),
+            updated=from_epoch(self.updated[i], datetime.timezone.utc),
+            id=self.ids[i]
+        )
+
+    def durations(self):
+        return array('q', (end - start for start, end in zip(self.start, self.end)))
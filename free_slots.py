@@ -0,0 +1,112 @@
+import bisect
+import datetime
+from collections import namedtuple
+
+from events import LOCAL_TZ, to_aware
+
+MIN_GAP = datetime.timedelta(minutes=15)
+FREE_KEYWORD = 'volno'
+
+Slot = namedtuple('Slot', ['start', 'end', 'duration', 'rink'])
+
+
+def merge_bookings(intervals):
+    """Sort (start, end) intervals and merge the overlapping ones in a single sweep."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def gaps_in_window(merged, starts, window_start, window_end, min_gap):
+    # starts = zacatky merged, pro bisect; merged jsou serazene a neprekryvaji se
+    cursor = window_start
+    i = max(bisect.bisect_right(starts, window_start) - 1, 0)
+    while i < len(merged):
+        start, end = merged[i]
+        if start >= window_end:
+            break
+        if end > cursor:
+            if start - cursor > min_gap:
+                yield cursor, start
+            cursor = end
+        i += 1
+    if window_end - cursor > min_gap:
+        yield cursor, window_end
+
+
+def day_windows(start, end, day_start, day_end):
+    day = start.astimezone(LOCAL_TZ).date()
+    while True:
+        window_start = LOCAL_TZ.localize(datetime.datetime.combine(day, day_start))
+        if window_start >= end:
+            return
+        window_end = LOCAL_TZ.localize(datetime.datetime.combine(day, day_end))
+        if window_end > start:
+            yield max(window_start, start), min(window_end, end)
+        day += datetime.timedelta(days=1)
+
+
+def find_free_slots(events, rink=None, min_gap=MIN_GAP, free_keyword=FREE_KEYWORD,
+                    day_start=None, day_end=None, days=None, now=None):
+    """Free ice of one rink: gaps longer than min_gap between bookings, in O(n log n).
+
+    Events whose name contains free_keyword are free ice, not bookings. The search starts with the first
+    booking that has not started before now, so the result changes only when a booking passes. With
+    day_start/day_end only gaps inside these daily hours are returned, days limits the look-ahead to
+    midnight after that many local days. Without days the search ends with the last event of the calendar.
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    now = to_aware(now).astimezone(LOCAL_TZ)
+
+    bookings = []
+    last_end = None
+    free_keyword = free_keyword.casefold() if free_keyword else None
+    for event in events:
+        start, end = to_aware(event.start_time), to_aware(event.end_time)
+        if last_end is None or end > last_end:
+            last_end = end
+        if free_keyword is None or free_keyword not in event.name.casefold():
+            bookings.append((start, end))
+
+    if last_end is None:
+        return []
+
+    if days is None:
+        horizon = last_end
+    else:
+        horizon = LOCAL_TZ.localize(datetime.datetime.combine(now.date() + datetime.timedelta(days=days),
+                                                              datetime.time()))
+
+    # zacatek hledani nezavisi na case spusteni, jen na nejblizsi budouci rezervaci
+    first = min((start for start, _ in bookings if start > now), default=None)
+    if first is None or horizon <= first:
+        return []
+
+    merged = merge_bookings(bookings)
+    starts = [start for start, _ in merged]
+
+    if day_start is None and day_end is None:
+        windows = [(first, horizon)]
+    else:
+        windows = day_windows(first, horizon, day_start or datetime.time(0, 0), day_end or datetime.time(23, 59, 59))
+
+    slots = []
+    for window_start, window_end in windows:
+        for start, end in gaps_in_window(merged, starts, window_start, window_end, min_gap):
+            slots.append(Slot(start, end, end - start, rink))
+    return slots
+
+
+def find_free_slots_across(events_by_rink, **query):
+    """Run the same query for several rinks, e.g. {'la': [...], 'ct': [...]}. Slots are sorted by start."""
+    slots = []
+    for rink, events in events_by_rink.items():
+        slots.extend(find_free_slots(events, rink=rink, **query))
+    slots.sort(key=lambda slot: (slot.start, slot.rink))
+    return slots
@@ -0,0 +1,181 @@
+import time
+from pathlib import Path
+
+from date_parsing import parse_rfc3339
+from events import Event, to_epoch, to_microseconds
+from paths import get_cache_dir
+from teams import match_teams
+
+# casy jako ISO text pro presnou rekonstrukci a jako epoch sekundy pro indexy
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    calendar TEXT NOT NULL,
+    id TEXT NOT NULL,
+    updated_us INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    start_epoch INTEGER NOT NULL,
+    end_epoch INTEGER NOT NULL,
+    home_team TEXT,
+    guest_team TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    latest INTEGER NOT NULL DEFAULT 1,
+    deleted REAL,
+    PRIMARY KEY (calendar, id, updated_us)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_start ON events (start_epoch) WHERE latest = 1;
+CREATE INDEX IF NOT EXISTS events_calendar_start ON events (calendar, start_epoch) WHERE latest = 1;
+CREATE INDEX IF NOT EXISTS events_home_team ON events (home_team, start_epoch) WHERE latest = 1;
+CREATE INDEX IF NOT EXISTS events_guest_team ON events (guest_team, start_epoch) WHERE latest = 1;
+CREATE INDEX IF NOT EXISTS events_first_seen ON events (calendar, first_seen) WHERE latest = 1;
+CREATE INDEX IF NOT EXISTS events_deleted ON events (calendar, deleted) WHERE deleted IS NOT NULL;
+'''
+COLUMNS = 'name, start_time, end_time, created, updated, id'
+
+
+def get_history_path(config):
+    return config['GENERAL'].get('HISTORY') or '{0}/history.sqlite'.format(get_cache_dir(config))
+
+
+def _bound(value):
+    return None if value is None else to_epoch(value)
+
+
+def _row_to_event(row):
+    name, start_time, end_time, created, updated, id = row
+    return Event(name, parse_rfc3339(start_time), parse_rfc3339(end_time), parse_rfc3339(created),
+                 parse_rfc3339(updated), id)
+
+
+class EventStore:
+    """Every version of every event seen in the calendars, keyed by (calendar, id, updated).
+
+    Queries return the latest version of events that were not removed from the calendar, so season statistics,
+    change history and free ice can be computed locally without the API.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            import sqlite3
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def sync(self, calendar, events, since=None, until=None, now=None):
+        """Store versions of events fetched from calendar.
+
+        since and until are the fetched window (timeMin, timeMax): events ending after since and starting
+        before until that are missing in events were removed from the calendar and are marked as deleted.
+        """
+        if now is None:
+            now = time.time()
+        rows = []
+        ids = []
+        for event in events:
+            teams = match_teams(event.name) or (None, None)
+            rows.append((
+                calendar, event.id, to_microseconds(event.updated), event.name,
+                event.start_time.isoformat(), event.end_time.isoformat(), event.created.isoformat(),
+                event.updated.isoformat(), to_epoch(event.start_time), to_epoch(event.end_time),
+                teams[0], teams[1], now, now
+            ))
+            ids.append((event.id,))
+
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO events (calendar, id, updated_us, name, start_time, end_time, created, updated, '
+                'start_epoch, end_epoch, home_team, guest_team, first_seen, last_seen) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                # obnovena smazana udalost se pro changes_since() bere jako nova
+                'ON CONFLICT (calendar, id, updated_us) DO UPDATE SET last_seen = excluded.last_seen, '
+                'first_seen = CASE WHEN deleted IS NULL THEN first_seen ELSE excluded.first_seen END, deleted = NULL',
+                rows
+            )
+            # starsi verze udalosti uz nejsou aktualni
+            self.connection.execute(
+                'UPDATE events SET latest = 0 WHERE calendar = ? AND latest = 1 AND EXISTS ('
+                'SELECT 1 FROM events newer WHERE newer.calendar = events.calendar AND newer.id = events.id '
+                'AND newer.updated_us > events.updated_us)',
+                (calendar,)
+            )
+            if since is not None:
+                self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS seen_ids (id TEXT PRIMARY KEY)')
+                self.connection.execute('DELETE FROM seen_ids')
+                self.connection.executemany('INSERT OR IGNORE INTO seen_ids (id) VALUES (?)', ids)
+                self.connection.execute(
+                    'UPDATE events SET deleted = ? WHERE calendar = ? AND latest = 1 AND deleted IS NULL '
+                    'AND end_epoch > ? AND start_epoch < ? AND id NOT IN (SELECT id FROM seen_ids)',
+                    (now, calendar, to_epoch(since), to_epoch(until) if until is not None else 2 ** 62)
+                )
+        return len(rows)
+
+    def events(self, calendar=None, start=None, end=None, team=None):
+        """Latest versions of existing events starting in [start, end), ordered by start."""
+        conditions = ['latest = 1', 'deleted IS NULL']
+        params = []
+        if calendar is not None:
+            conditions.append('calendar = ?')
+            params.append(calendar)
+        if start is not None:
+            conditions.append('start_epoch >= ?')
+            params.append(_bound(start))
+        if end is not None:
+            conditions.append('start_epoch < ?')
+            params.append(_bound(end))
+        if team is not None:
+            conditions.append('(home_team = ? OR guest_team = ?)')
+            params.extend((team, team))
+
+        rows = self.connection.execute(
+            'SELECT {0} FROM events WHERE {1} ORDER BY start_epoch, id'.format(COLUMNS, ' AND '.join(conditions)),
+            params
+        )
+        return [_row_to_event(row) for row in rows]
+
+    def changes_since(self, calendar, since):
+        """Events of calendar added or changed at or after since (time.time() value) and ids of events deleted since."""
+        rows = self.connection.execute(
+            'SELECT {0} FROM events WHERE calendar = ? AND latest = 1 AND deleted IS NULL AND first_seen >= ? '
+            'ORDER BY start_epoch, id'.format(COLUMNS),
+            (calendar, since)
+        )
+        changed = [_row_to_event(row) for row in rows]
+        deleted = [row[0] for row in self.connection.execute(
+            'SELECT id FROM events WHERE calendar = ? AND latest = 1 AND deleted >= ?', (calendar, since)
+        )]
+        return changed, deleted
+
+    def history(self, calendar, id):
+        """All stored versions of one event, oldest first, as (event, first_seen, deleted) tuples."""
+        rows = self.connection.execute(
+            'SELECT {0}, first_seen, deleted FROM events WHERE calendar = ? AND id = ? ORDER BY updated_us'.format(
+                COLUMNS),
+            (calendar, id)
+        )
+        return [(_row_to_event(row[:6]), row[6], row[7]) for row in rows]
+
+    def teams(self, calendar=None):
+        """Normalized names of all teams with a stored match."""
+        condition, params = ('AND calendar = ?', (calendar,)) if calendar is not None else ('', ())
+        rows = self.connection.execute(
+            'SELECT home_team FROM events WHERE latest = 1 AND deleted IS NULL AND home_team IS NOT NULL {0} '
+            'UNION SELECT guest_team FROM events WHERE latest = 1 AND deleted IS NULL AND guest_team IS NOT NULL {0}'
+            .format(condition),
+            params * 2
+        )
+        return sorted(row[0] for row in rows)
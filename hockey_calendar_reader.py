@@ -1,72 +1,31 @@
 #!/usr/bin/env python3
 import argparse
 import configparser
+import hashlib
 import logging
-import subprocess
+import random
+import shutil
+import signal
 import re
-from icalendar import Calendar, Event
-import requests
 import datetime
-from dateutil.rrule import *
-import pytz
 import locale
-import os
-from dateutil.parser import parse
+import threading
+import time
 from pathlib import Path
 
-# email sending
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-
-
-class Event:
-    def __init___(self, name, start_time, end_time, created, updated, id):
-        self.name = name
-        self.start_time = start_time
-        self.end_time = end_time
-        self.created = created
-        self.updated = updated
-        self.id = id
-
-    def __str__(self):
-        return (
-            f"Event:\n"
-            f"  Name: {self.name}\n"
-            f"  Start Time: {self.start_time}\n"
-            f"  End Time: {self.end_time}\n"
-            f"  Created: {self.created}\n"
-            f"  Updated: {self.updated}\n"
-            f"  ID: {self.id}"
-        )
-
-
-def send_email(subject, content):
-    sender_email = config['EMAIL-BREVO']['SENDER']
-    recipient_emails = recipients  # seznam příjemců, např. ['email1@example.com', 'email2@example.com']
-    smtp_server = config['EMAIL-BREVO']['SMTP_SERVER']
-    smtp_port = int(config['EMAIL-BREVO']['SMTP_PORT'])
-    smtp_username = config['EMAIL-BREVO']['SMTP_LOGIN']
-    smtp_password = config['EMAIL-BREVO']['SMTP_PASSWORD']
-
-    # Sestavení emailu
-    message = MIMEMultipart("alternative")
-    message["Subject"] = subject
-    message["From"] = sender_email
-    message["To"] = ", ".join(recipient_emails)
-
-    # Přidání HTML obsahu
-    html_part = MIMEText(content, "html")
-    message.attach(html_part)
-
-    try:
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()  # Zapnout TLS
-            server.login(smtp_username, smtp_password)
-            server.sendmail(sender_email, recipient_emails, message.as_string())
-        print("Email byl odeslán.")
-    except Exception as exp:
-        logging.error(f"Sending failed: {repr(exp)}")
+from calendar_api import API_URL, EVENT_FIELDS, ResponseCache, events_url, fetch_concurrently, iter_items, sync_events
+from changes import ADDED, REMOVED, diff_events, fingerprint
+from date_parsing import parse_czech_datetime, parse_event_time, parse_rfc3339
+from events import LOCAL_TZ, Event, to_aware
+from free_slots import FREE_KEYWORD, find_free_slots
+from history import EventStore, get_history_path
+from html_render import Table
+from instrumentation import append_report, get_report, profiled, stage
+from outbox import Outbox, drain_outbox, get_outbox_path, get_report_path, spawn_worker
+from paths import get_cache_dir as cache_dir_of, migrate_cache_dir
+from publisher import OutputPublisher, RenderedFiles
+from snapshots import SnapshotError, read_snapshot, write_snapshot
+from views import View, ViewRouter
 
 
 def print_all_events(all_events):
@@ -101,128 +60,91 @@ def print_specific_upcoming_events_to_textfile(all_events, keywords, file_locati
                 )
 
 
-def print_specific_events_to_textfile(all_events, keywords, file_location):
-    with open(file_location, 'w', encoding='utf-8') as f:
-        for event in all_events:
-            # tmp fix SOLIDA
-            if 'bystřec' not in event.name.lower() and 'solida' in event.name.lower():
-                compiled = re.compile(re.escape('solida'), re.IGNORECASE)
-                res = compiled.sub('SOLIDA Bystřec', event.name)
-                event.name = res
+def print_specific_events_to_textfile(all_events, keywords, publisher, filename):
+    print_events_to_textfile(
+        [event for event in all_events if all(keyword.lower() in event.name.lower() for keyword in keywords)],
+        publisher,
+        filename
+    )
 
-            if all(keyword.lower() in event.name.lower() for keyword in keywords):
-                f.write('{0};{1};{2};{3};{4};{5}\n'
-                    .format(
-                        event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                        event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                        event.name,
-                        event.created.strftime('%A %d.%m.%Y %H:%M:%S'),
-                        event.updated.strftime('%A %d.%m.%Y %H:%M:%S'),
-                        event.id
-                    )
-                )
 
+def format_event_row(event):
+    return (
+        event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
+        event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
+        event.name,
+        event.created.strftime('%A %d.%m.%Y %H:%M:%S'),
+        event.updated.strftime('%A %d.%m.%Y %H:%M:%S'),
+        event.id
+    )
 
-def print_available_events_to_textfile(events, file_location):
-    with open(file_location, 'w', encoding='utf-8') as f:
-        for i in range(0, len(events) - 1):
 
-            if 'volno' in events[i].name.lower() and events[i].start_time > datetime.datetime.now(datetime.timezone.utc):
-                f.write('{0};{1};{2}\n'
-                    .format(
-                        events[i].start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                        events[i].end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                        events[i].end_time - events[i].start_time
-                    )
-                )
+def print_events_to_textfile(events, publisher, filename):
+    publisher.text(filename, ''.join(['{0};{1};{2};{3};{4};{5}\n'.format(*format_event_row(event)) for event in events]))
 
-            time_space = events[i + 1].start_time.replace(tzinfo=pytz.UTC) - events[i].end_time.replace(tzinfo=pytz.UTC)
-            if time_space > datetime.timedelta(minutes=15) and events[i].start_time.replace(tzinfo=pytz.UTC) > datetime.datetime.now(datetime.timezone.utc):
-                f.write('{0};{1};{2}\n'
-                        .format(
-                            events[i].end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                            events[i+1].start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                            time_space
-                        )
-                )
 
+SOLIDA_REGEX = re.compile(re.escape('solida'), re.IGNORECASE)
+
+
+def fix_event_name(name):
+    # tmp fix SOLIDA
+    if 'bystřec' not in name.lower() and 'solida' in name.lower():
+        return SOLIDA_REGEX.sub('SOLIDA Bystřec', name)
+    return name
+
+
+def get_free_slot_query():
+    section = config['FREE_SLOTS'] if config.has_section('FREE_SLOTS') else {}
+    query = {
+        'min_gap': datetime.timedelta(minutes=int(section.get('MIN_GAP_MINUTES', 15))),
+        'free_keyword': section.get('FREE_KEYWORD', FREE_KEYWORD)
+    }
+    if section.get('DAY_START'):
+        query['day_start'] = datetime.time.fromisoformat(section['DAY_START'])
+    if section.get('DAY_END'):
+        query['day_end'] = datetime.time.fromisoformat(section['DAY_END'])
+    if section.get('DAYS'):
+        query['days'] = int(section['DAYS'])
+    return query
+
+
+def get_available_slots(events):
+    return find_free_slots(events, **get_free_slot_query())
 
-def generate_html_from_text_file(prefix_path, source_file, output_file, headline):
-    loaded_lines = open('{0}/{1}'.format(prefix_path, source_file), 'r', encoding='utf-8').readlines()
-
-    with open('{0}/{1}'.format(prefix_path, output_file), 'w', encoding='utf-8') as f:
-        f.write('<html>\n')
-        f.write('<head>\n')
-        f.write('<meta charset="UTF-8">\n')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css" integrity="sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u" crossorigin="anonymous">')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">')
-        f.write('<script src="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/js/bootstrap.min.js" integrity="sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa" crossorigin="anonymous"></script>')
-        f.write('<title>{0}</title>\n'.format(headline))
-        f.write('</head>\n')
-        f.write('<body>\n')
-        f.write('<div style="text-align: center; align-self: center; margin: auto; align-content: center;">\n')
-        f.write('<h2>{0}</h2>\n'.format(headline))
-        f.write('<h4>Aktualizováno v {0} </h4>\n'.format(datetime.datetime.now().strftime('%A %d.%m.%Y %H:%M:%S')))
-        f.write('<div class="panel panel-default" style="width: 90%; align-self: center;margin: auto;">\n')
-        f.write('<table class="table table-hover table-responsive table-bordered" style="width: 100%; margin: auto">\n')
-        f.write('<tbody>\n')
-        if len(loaded_lines) == 0:
-            f.write('<tr><td colspan="3" style="text-align: center">Žádná požadovaná událost nebyla v kalendáři nalezena</td></tr>\n')
-        else:
-            f.write('<tr class="info"><th>Začátek</th><th></th><th>Konec</th><th>Název</th><th>Vytvořeno</th><th>Upraveno</th></tr>')
-        for line in loaded_lines:
-            splitted = line.split(';')
-            f.write(
-                '<tr>'
-                '<td>{0}</td><td style="text-align: center;">-</td><td>{1}</td><td>{2}</td><td>{3}</td><td>{4}</td>'
-                '</tr>\n'
-                    .format(splitted[0], splitted[1], splitted[2], splitted[3], splitted[4]))
-
-        f.write('</tbody>')
-        f.write('</table>\n')
-        f.write('</div>\n')
-        f.write('</div>\n')
-        f.write('</body>\n')
-        f.write('</html>\n')
-
-
-def generate_html_from_text_file_available_events(prefix_path, source_file, output_file, headline):
-    loaded_lines = open('{0}/{1}'.format(prefix_path, source_file), 'r', encoding='utf-8').readlines()
-
-    with open('{0}/{1}'.format(prefix_path, output_file), 'w', encoding='utf-8') as f:
-        f.write('<html>\n')
-        f.write('<head>\n')
-        f.write('<meta charset="UTF-8">\n')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css" integrity="sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u" crossorigin="anonymous">')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">')
-        f.write('<script src="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/js/bootstrap.min.js" integrity="sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa" crossorigin="anonymous"></script>')
-        f.write('<title>{0}</title>\n'.format(headline))
-        f.write('</head>\n')
-        f.write('<body>\n')
-        f.write('<div style="text-align: center; align-self: center; margin: auto; align-content: center;">\n')
-        f.write('<h2>{0}</h2>\n'.format(headline))
-        f.write('<h4>Aktualizováno v {0} </h4>\n'.format(datetime.datetime.now().strftime('%A %d.%m.%Y %H:%M:%S')))
-        f.write('<div class="panel panel-default" style="width: 90%; align-self: center;margin: auto;">\n')
-        f.write('<table class="table table-hover table-responsive table-bordered" style="width: 100%; margin: auto">\n')
-        f.write('<tbody>\n')
-        if len(loaded_lines) == 0:
-            f.write('<tr><td colspan="3" style="text-align: center">Žádná požadovaná událost nebyla v kalendáři nalezena</td></tr>\n')
-        else:
-            f.write('<tr class="info"><th>Začátek</th><th></th><th>Konec</th><th>Doba</th><th>Volno</th></tr>')
-        for line in loaded_lines:
-            splitted = line.split(';')
-            f.write(
-                '<tr>'
-                '<td>{0}</td><td style="text-align: center;">-</td><td>{1}</td><td>{2}</td><td>{3}</td>'
-                '</tr>\n'
-                    .format(splitted[0], splitted[1], splitted[2], 'volno'))
-
-        f.write('</tbody>')
-        f.write('</table>\n')
-        f.write('</div>\n')
-        f.write('</div>\n')
-        f.write('</body>\n')
-        f.write('</html>\n')
+
+def format_slot_row(slot):
+    return (
+        slot[0].strftime('%A %d.%m.%Y %H:%M:%S'),
+        slot[1].strftime('%A %d.%m.%Y %H:%M:%S'),
+        slot[2],
+        'volno'
+    )
+
+
+def print_available_events_to_textfile(slots, publisher, filename):
+    publisher.text(filename, ''.join(['{0};{1};{2}\n'.format(*format_slot_row(slot)) for slot in slots]))
+
+
+EVENTS_TABLE = Table(
+    '<tr class="info"><th>Začátek</th><th></th><th>Konec</th><th>Název</th><th>Vytvořeno</th><th>Upraveno</th></tr>',
+    '<tr>'
+    '<td>{0}</td><td style="text-align: center;">-</td><td>{1}</td><td>{2}</td><td>{3}</td><td>{4}</td>'
+    '</tr>\n'
+)
+AVAILABLE_EVENTS_TABLE = Table(
+    '<tr class="info"><th>Začátek</th><th></th><th>Konec</th><th>Doba</th><th>Volno</th></tr>',
+    '<tr>'
+    '<td>{0}</td><td style="text-align: center;">-</td><td>{1}</td><td>{2}</td><td>{3}</td>'
+    '</tr>\n'
+)
+
+
+def generate_html_from_events(publisher, events, output_file, headline):
+    publisher.page(output_file, EVENTS_TABLE.render(headline, [format_event_row(event) for event in events]))
+
+
+def generate_html_available_events(publisher, slots, output_file, headline):
+    publisher.page(output_file, AVAILABLE_EVENTS_TABLE.render(headline, [format_slot_row(slot) for slot in slots]))
 
 
 def print_event(event):
@@ -236,82 +158,55 @@ def print_event(event):
     )
 
 
-def get_event_by_id(events, id):
-    for event in events:
-        if event.id == id:
-            return event
+def parse_czech_date_to_valid_format(czechdate):
+    return parse_czech_datetime(czechdate)
+
+
+def event_from_textfile_line(line):
+    splitted = line.rstrip('\n').split(';')
+    # created/updated byly v textovych souborech v UTC
+    return Event(
+        name=splitted[2],
+        start_time=parse_czech_date_to_valid_format(splitted[0]),
+        end_time=parse_czech_date_to_valid_format(splitted[1]),
+        created=parse_czech_date_to_valid_format(splitted[3]).replace(tzinfo=datetime.timezone.utc),
+        updated=parse_czech_date_to_valid_format(splitted[4]).replace(tzinfo=datetime.timezone.utc),
+        id=splitted[5]
+    )
 
-    return None
 
+def get_cache_dir():
+    return cache_dir_of(config)
 
-def get_ids_of_events_list(events):
-    ids = []
 
-    for event in events:
-        ids.append(event.id)
+def get_snapshot_path(view):
+    return '{0}/{1}.snapshot'.format(get_cache_dir(), view.name)
 
-    return ids
 
+def load_previous_events(output_dir, view):
+    snapshot_path = get_snapshot_path(view)
+    if Path(snapshot_path).is_file():
+        try:
+            return read_snapshot(snapshot_path)
+        except (OSError, SnapshotError) as exp:
+            logging.error(f'Reading snapshot failed: {repr(exp)}')
 
-def parse_czech_date_to_valid_format(czechdate):
-    splitted = czechdate.split(' ')
-    return parse(splitted[1] + ' ' + splitted[2], dayfirst=True)
-
-
-def check_news(prefix, filename):
-    if not Path(f'{prefix}/{filename}.backup').is_file():
-        old_content = ''
-        old_lines = []
-    else:
-        old_content = open('{0}/{1}.backup'.format(prefix, filename), 'r').read()
-        with open('{0}/{1}.backup'.format(prefix, filename), 'r') as f:
-            old_lines = f.readlines()
-
-    new_content = open('{0}/{1}'.format(prefix, filename), 'r').read()
-
-    if old_content == new_content:
-        return
-
-    if not Path(f'{prefix}/{filename}.backup').is_file():
-        old_lines = []
-    else:
-        with open('{0}/{1}.backup'.format(prefix, filename), 'r') as f:
-            old_lines = f.readlines()
-
-    old_events = []
-    for line in old_lines:
-        splitted = line.split(';')
-        tmp_event = Event()
-        tmp_event.start_time = parse_czech_date_to_valid_format(splitted[0])
-        tmp_event.end_time = parse_czech_date_to_valid_format(splitted[1])
-        tmp_event.name = splitted[2]
-        tmp_event.created = parse_czech_date_to_valid_format(splitted[3])
-        tmp_event.updated = parse_czech_date_to_valid_format(splitted[4])
-        tmp_event.id = splitted[5]
-        old_events.append(tmp_event)
-
-    with open('{0}/{1}'.format(prefix, filename), 'r') as f:
-        new_lines = f.readlines()
-
-    new_events = []
-    for line in new_lines:
-        splitted = line.split(';')
-        tmp_event = Event()
-        tmp_event.start_time = parse_czech_date_to_valid_format(splitted[0])
-        tmp_event.end_time = parse_czech_date_to_valid_format(splitted[1])
-        tmp_event.name = splitted[2]
-        tmp_event.created = parse_czech_date_to_valid_format(splitted[3])
-        tmp_event.updated = parse_czech_date_to_valid_format(splitted[4])
-        tmp_event.id = splitted[5]
-        new_events.append(tmp_event)
-
-    new_events_ids = get_ids_of_events_list(new_events)
-    old_events_ids = get_ids_of_events_list(old_events)
-    ids_added = list(set(new_events_ids) - set(old_events_ids))
-    ids_removed = list(set(old_events_ids) - set(new_events_ids))
-
-    for id in ids_added:
-        event = get_event_by_id(new_events, id)
+    # starsi verze porovnavaly vygenerovane textove soubory
+    text_file = '{0}/{1}'.format(output_dir, view.text_file)
+    if Path(text_file).is_file():
+        with open(text_file, 'r', encoding='utf-8') as f:
+            return [event_from_textfile_line(line) for line in f]
+
+    return []
+
+
+def check_news(old_events, new_events):
+    return diff_events(old_events, new_events)
+
+
+def format_change(change):
+    if change.kind == ADDED:
+        event = change.event
         message = 'Událost přidana do kalendáře<br>\n' \
                   '<br>\n' \
                   'Název: {0}<br>\n' \
@@ -323,11 +218,11 @@ def check_news(prefix, filename):
             event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
             event.created.strftime('%A %d.%m.%Y %H:%M:%S')
         )
-        send_email('Hockey Calendar Reader - Nová událost', message)
+        return 'Hockey Calendar Reader - Nová událost', message
 
-    for id in ids_removed:
-        event = get_event_by_id(old_events, id)
-        if event.start_time.replace(tzinfo=None) > datetime.datetime.now():
+    if change.kind == REMOVED:
+        event = change.event
+        if to_aware(event.start_time) > datetime.datetime.now(datetime.timezone.utc):
             message = 'Událost začala<br>\n' \
                       '<br>\n' \
                       'Název: {0}<br>\n' \
@@ -337,7 +232,7 @@ def check_news(prefix, filename):
                 event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
                 event.end_time.strftime('%A %d.%m.%Y %H:%M:%S')
             )
-            send_email('Hockey Calendar Reader - Událost začala', message)
+            return 'Hockey Calendar Reader - Událost začala', message
         else:
             message = 'Událost zrušena<br>\n' \
                       '<br>\n' \
@@ -348,179 +243,523 @@ def check_news(prefix, filename):
                 event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
                 event.end_time.strftime('%A %d.%m.%Y %H:%M:%S')
             )
-            send_email('Hockey Calendar Reader - Událost zrušena', message)
-
-    for new_event in new_events:
-        old_event = get_event_by_id(old_events, new_event.id)
-        if old_event is not None:
-            if old_event.updated != new_event.updated:
-                message = 'Událost byla aktualizována' \
-                          '<br>\n' \
-                          'Nový název: {0}<br>\n' \
-                          'Nově od: {1}<br>\n' \
-                          'Nově do: {2}<br>\n' \
-                          '<br>\n' \
-                          'Původní název: {3}<br>\n' \
-                          'Původně od: {4}<br>\n' \
-                          'Původně do: {5}<br>\n' \
-                          '---<br>\n' \
-                          '---<br>\n' \
-                          'old:<br>\n' \
-                          '{6}<br>\n' \
-                          'new:<br>\n' \
-                          '{7}<br>\n'.format(
-                    new_event.name,
-                    new_event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                    new_event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                    old_event.name,
-                    old_event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                    old_event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
-                    old_event,
-                    new_event
-                )
-                send_email('Hockey Calendar Reader - Událost aktualizována', message)
+            return 'Hockey Calendar Reader - Událost zrušena', message
+
+    new_event = change.event
+    old_event = change.old_event
+    message = 'Událost byla aktualizována' \
+              '<br>\n' \
+              'Nový název: {0}<br>\n' \
+              'Nově od: {1}<br>\n' \
+              'Nově do: {2}<br>\n' \
+              '<br>\n' \
+              'Původní název: {3}<br>\n' \
+              'Původně od: {4}<br>\n' \
+              'Původně do: {5}<br>\n' \
+              '---<br>\n' \
+              '---<br>\n' \
+              'old:<br>\n' \
+              '{6}<br>\n' \
+              'new:<br>\n' \
+              '{7}<br>\n'.format(
+        new_event.name,
+        new_event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
+        new_event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
+        old_event.name,
+        old_event.start_time.strftime('%A %d.%m.%Y %H:%M:%S'),
+        old_event.end_time.strftime('%A %d.%m.%Y %H:%M:%S'),
+        old_event,
+        new_event
+    )
+    return 'Hockey Calendar Reader - Událost aktualizována', message
 
 
-def backup_file(prefix, filename):
-    if Path(f'{prefix}/{filename}').is_file():
-        os.system("mv {0}/{1} {0}/{1}.backup".format(prefix, filename))
+def format_notifications(changes):
+    """(subject, message, key) of each change, as put to the outbox."""
+    return [format_change(change) + ('{0}:{1}'.format(change.kind, change.event.id),) for change in changes]
 
 
-def get_events_from_calendar(calendar_id):
-    url = 'https://www.googleapis.com/calendar/v3/calendars/' + calendar_id + '/events'
+def iter_calendar_events(items):
+    for event in items:
+        if event['status'] == 'cancelled':
+            continue
+        start_time = parse_event_time(event['start'])
+        end_time = parse_event_time(event['end'])
+
+        if 'summary' not in event.keys():
+            continue
+
+        yield Event(
+            name=fix_event_name(event['summary']),
+            start_time=start_time,
+            end_time=end_time,
+            created=parse_rfc3339(event['created']),
+            updated=parse_rfc3339(event['updated']),
+            id=event['id']
+        )
+
+
+def get_horizon(now):
+    """End of the look-ahead window (timeMax), None when HORIZON_DAYS is not set."""
+    days = config['CALENDAR'].get('HORIZON_DAYS')
+    if not days:
+        return None
+    return LOCAL_TZ.localize(datetime.datetime.combine(now.astimezone(LOCAL_TZ).date(), datetime.time())) + \
+        datetime.timedelta(days=int(days) + 1)
+
+
+def in_window(event, now, horizon):
+    return to_aware(event.end_time) > now and (horizon is None or to_aware(event.start_time) < horizon)
+
+
+def get_events_from_calendar_incremental(calendar_id):
+    cache_dir = get_cache_dir()
+    items = sync_events(
+        calendar_id,
+        config['CALENDAR']['API_KEY'],
+        '{0}/{1}.sync.json'.format(cache_dir, calendar_id),
+        api_url=config['CALENDAR'].get('API_URL', fallback=API_URL)
+    )
+
+    # stejna semantika jako timeMin + timeMax + orderBy=startTime
+    now = datetime.datetime.now(datetime.timezone.utc)
+    horizon = get_horizon(now)
+    all_events = [event for event in iter_calendar_events(items) if in_window(event, now, horizon)]
+    all_events.sort(key=lambda event: to_aware(event.start_time))
+
+    return all_events
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None and config['CALENDAR'].getboolean('HTTP_CACHE', fallback=True):
+        _response_cache = ResponseCache('{0}/http'.format(get_cache_dir()))
+        _response_cache.prune()
+    return _response_cache
+
 
+def iter_events_from_calendar(calendar_id):
+    url = events_url(calendar_id, config['CALENDAR'].get('API_URL', fallback=API_URL))
+
+    # timeMin je zacatek dne, aby se dotaz behem dne nemenil a odpoved sla revalidovat pres ETag;
+    # udalosti, ktere uz skoncily, se odfiltruji lokalne
+    now = datetime.datetime.now(datetime.timezone.utc)
+    day_start = LOCAL_TZ.localize(datetime.datetime.combine(now.astimezone(LOCAL_TZ).date(), datetime.time()))
+    horizon = get_horizon(now)
     PARAMS = {
         'key': config['CALENDAR']['API_KEY'],
         'singleEvents': 'True',
-        'timeMin': datetime.datetime.now().isoformat() + 'Z',
+        'timeMin': day_start.isoformat(),
         'orderBy': 'startTime',
-        'maxResults': 2500
+        'maxResults': 2500,
+        'fields': EVENT_FIELDS
     }
+    if horizon is not None:
+        PARAMS['timeMax'] = horizon.isoformat()
 
-    events = requests.get(url=url, params=PARAMS).json()['items']
+    events = iter_calendar_events(iter_items(url, PARAMS, get_response_cache()))
+    return (event for event in events if in_window(event, now, horizon))
 
-    all_events = []
-    for event in events:
-        if event['status'] == 'cancelled':
-            continue
-        if 'dateTime' in event['start']:
-            start_time = parse(event['start']['dateTime'])
-        else:
-            start_time = parse(event['start']['date'])
 
-        if 'dateTime' in event['end']:
-            end_time = parse(event['end']['dateTime'])
+def get_events_from_calendar(calendar_id):
+    # stazeni a parsovani se meri dohromady, stranky se parsuji prubezne
+    with stage('fetch') as stats:
+        if config['CALENDAR'].getboolean('INCREMENTAL_SYNC', fallback=False):
+            events = get_events_from_calendar_incremental(calendar_id)
         else:
-            end_time = parse(event['end']['date'])
+            events = list(iter_events_from_calendar(calendar_id))
+        stats['events'] = len(events)
+    return events
 
-        if 'summary' not in event.keys():
-            continue
 
-        tmp_event = Event()
-        tmp_event.id = event['id']
-        tmp_event.name = event['summary']
-        tmp_event.start_time = start_time
-        tmp_event.end_time = end_time
-        tmp_event.created = parse(event['created'])
-        tmp_event.updated = parse(event['updated'])
+VIEWS = [
+    # Ledy - Hrdina
+    View('la', ['Hrdina'], 'hrdina-la', 'Ledy na jméno Hrdina v Lanškrouně', notify=True),
+    # Volné bruslení
+    View('la', ['volné bruslení'], 'brusleni-la', 'Volné bruslení v Lanškrouně'),
+    View('ct', ['VEŘEJNÉ BRUSLENÍ'], 'brusleni-ct', 'Volné bruslení v České Třebové'),
+    # Ledy - Bystřec
+    View('la', ['Bystřec'], 'bystrec-la', 'Ledy na jméno Bystřec v Lanškrouně', notify=True),
+    View('ct', ['Bystřec'], 'bystrec-ct', 'Ledy na jméno Bystřec v České Třebové', notify=True),
+    # Ledy - Bys
+    View('la', ['Bys'], 'bys', 'Ledy na jméno Bystřec v Lanškrouně'),
+    # Příchozí
+    View('la', ['příchozí'], 'prichozi-la', 'Hokej pro příchozí v Lanškrouně'),
+    View('ct', ['příchozí'], 'prichozi-ct', 'Hokej pro příchozí v České Třebové'),
+    # Naše LHL a CHL zápasy
+    View('la', ['Bystřec', 'LHL'], 'zapasy-lhl-bystrec', 'Zápasy LHL', notify=True),
+    View('ct', ['CHL', 'Bystřec'], 'zapasy-chl-bystrec', 'Zápasy CHL', notify=True),
+    # LHL a CHL zápasy
+    View('la', ['LHL č.'], 'zapasy-lhl', 'Zápasy LHL'),
+    View('ct', ['CHL'], 'zapasy-chl', 'Zápasy CHL'),
+]
+
 
-        all_events.append(tmp_event)
-    
-    return all_events
+# vychozi kalendare, config je muze nahradit sekcemi [CALENDARS] a [AVAILABLE]
+CALENDARS = {
+    'la': 'halabmlan@gmail.com',
+    'ct': 'n7i0r6c4810701q9f4ffvpbjd8@group.calendar.google.com'
+}
+AVAILABLE_PAGES = [
+    ('la', 'available-la', 'Volné termíny v Lanškrouně'),
+    ('ct', 'available-ct', 'Volné termíny v České Třebové'),
+]
+
+# sekundy
+POLL_INTERVAL = 300
+POLL_JITTER = 30
+# sekundy; jak casto se kontroluje outbox, dokud bezi jeho vyprazdneni
+DRAIN_RECHECK = 10
 
 
 def clean_temp_files():
-    subprocess.run(['rm', '-rf', config['GENERAL']['OUTPUT_DIR']])
+    shutil.rmtree(config['GENERAL']['OUTPUT_DIR'], ignore_errors=True)
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Hockey-calendar-reader started')
-    parser.add_argument('--config', required=True, help='Path to config file')
-    args = parser.parse_args()
+def load_calendars():
+    if config.has_section('CALENDARS'):
+        CALENDARS.clear()
+        CALENDARS.update(config['CALENDARS'])
+    if config.has_section('AVAILABLE'):
+        AVAILABLE_PAGES[:] = [(calendar, 'available-{0}'.format(calendar), headline)
+                              for calendar, headline in config['AVAILABLE'].items()]
+    AVAILABLE_PAGES[:] = [page for page in AVAILABLE_PAGES if page[0] in CALENDARS]
+
+
+def setup(config_path):
+    global config, local_tz
     config = configparser.ConfigParser()
-    config.read(args.config)
+    config.read(config_path, encoding='utf-8')
     logging.basicConfig(filename=config['GENERAL']['LOG'], format='%(asctime)s %(levelname)s %(message)s', level=logging.DEBUG)
-    logging.info('Bazoš started')
-    recipients = config['GENERAL']['RECIPIENTS'].split(' ')
     locale.setlocale(locale.LC_ALL, "cs_CZ.UTF-8")
-    global local_tz
-    local_tz = pytz.timezone('Europe/Prague')
-
-    #clean_temp_files()
+    local_tz = LOCAL_TZ
+    load_calendars()
 
+    if migrate_cache_dir(config):
+        logging.info(f'Cache moved from OUTPUT_DIR to {get_cache_dir()}')
     Path(config['GENERAL']['OUTPUT_DIR']).mkdir(parents=True, exist_ok=True)
 
-    LA_calendar_id = 'halabmlan@gmail.com'
-    CT_calendar_id = 'n7i0r6c4810701q9f4ffvpbjd8@group.calendar.google.com'
 
-    upcoming_events_ceska_trebova = get_events_from_calendar(CT_calendar_id)
-    upcoming_events_lanskroun = get_events_from_calendar(LA_calendar_id)
+class CalendarResult:
+    """What processing of one calendar leaves for the publishing process.
+
+    Rendered files, formatted notifications and events of notified views for snapshots; unchanged calendars
+    (same digest as the last run) carry nothing but the digest.
+    """
+
+    __slots__ = ('calendar', 'digest', 'files', 'notifications', 'snapshots', 'stages')
+
+    def __init__(self, calendar, digest=None):
+        self.calendar = calendar
+        self.digest = digest
+        self.files = RenderedFiles()
+        self.notifications = []
+        self.snapshots = []
+        self.stages = None
+
+
+def process_calendar(calendar, events, previous_events, result=None):
+    """Route, render, find free slots and diff notified views of one calendar."""
+    if result is None:
+        result = CalendarResult(calendar)
+    views = [view for view in VIEWS if view.calendar == calendar]
+    with stage('route') as stats:
+        routed_events = ViewRouter(views).route({calendar: events})
+        stats['events'] = sum(len(view_events) for view_events in routed_events.values())
+
+    with stage('render') as stats:
+        for view in views:
+            print_events_to_textfile(routed_events[view.name], result.files, view.text_file)
+            generate_html_from_events(result.files, routed_events[view.name], view.html_file, view.headline)
+        stats['events'] = sum(len(routed_events[view.name]) for view in views)
+
+    # Available events
+    for _, name, headline in (page for page in AVAILABLE_PAGES if page[0] == calendar):
+        with stage('free_slots') as stats:
+            slots = get_available_slots(events)
+            stats['events'] = len(slots)
+        print_available_events_to_textfile(slots, result.files, '{0}.txt'.format(name))
+        generate_html_available_events(result.files, slots, '{0}.html'.format(name), headline)
+
+    for view in views:
+        if view.notify:
+            with stage('check_news') as stats:
+                changes = check_news(previous_events[view.name], routed_events[view.name])
+                stats['events'] = len(changes.added) + len(changes.removed) + len(changes.updated)
+            result.notifications += format_notifications(changes)
+            result.snapshots.append((view, routed_events[view.name]))
+    return result
+
+
+def publish_results(results, outbox):
+    """Publish files of all results at once, queue notifications and store snapshots. Returns events of notified views."""
+    with OutputPublisher(config['GENERAL']['OUTPUT_DIR']) as publisher:
+        for result in results:
+            result.files.publish_to(publisher)
+
+    current_events = {}
+    for result in results:
+        for subject, message, key in result.notifications:
+            outbox.put(subject, message, key)
+        for view, events in result.snapshots:
+            with stage('snapshot'):
+                write_snapshot(get_snapshot_path(view), events)
+            current_events[view.name] = events
+    return current_events
+
+
+def process_events(events_by_calendar, previous_events, outbox):
+    """Render all pages, queue notifications and store snapshots. Returns events of notified views."""
+    results = [process_calendar(calendar, events, previous_events) for calendar, events in events_by_calendar.items()]
+    return publish_results(results, outbox)
+
+
+def record_history(store, events_by_calendar):
+    # chybejici udalosti se hledaji jen ve stazenem okne
+    since = datetime.datetime.now(datetime.timezone.utc)
+    until = get_horizon(since)
+    with stage('history') as stats:
+        stats['events'] = sum(store.sync(CALENDARS[calendar], events, since=since, until=until)
+                              for calendar, events in events_by_calendar.items())
+
+
+def events_digest(events):
+    return hashlib.sha1(repr(events_fingerprint(events)).encode('utf-8')).hexdigest()
+
+
+def shard_calendar(calendar, digest=None, store=None, previous_events=None):
+    """Fetch one calendar, store its history and process it. Calendars are independent of each other."""
+    return process_shard(calendar, get_events_from_calendar(CALENDARS[calendar]), digest, store, previous_events)
+
+
+def process_shard(calendar, events, digest=None, store=None, previous_events=None):
+    """Store history of fetched events of one calendar and process them.
+
+    With digest of the previous run and no change since, only the digest is returned. A warm process passes
+    its open store and the last events of notified views; without them the shard opens a connection of its own
+    and reads the snapshots.
+    """
+    result = CalendarResult(calendar, events_digest(events))
+    if result.digest == digest:
+        return result
+
+    own_store = store is None
+    if own_store:
+        store = EventStore(get_history_path(config))
+    try:
+        record_history(store, {calendar: events})
+    except Exception as exp:
+        logging.error(f'Storing history of {calendar} failed: {repr(exp)}')
+    finally:
+        if own_store:
+            store.close()
 
-    #prefix_path = '/var/www/my_web/hockey_events/'
     output_dir = config['GENERAL']['OUTPUT_DIR']
-    backup_file(output_dir, 'hrdina-la.txt')
-    backup_file(output_dir, 'bystrec-la.txt')
-    backup_file(output_dir, 'bystrec-ct.txt')
-    backup_file(output_dir, 'zapasy-lhl-bystrec.txt')
-    backup_file(output_dir, 'zapasy-chl-bystrec.txt')
-    backup_file(output_dir, 'bys.txt')
+    previous_events = previous_events or {}
+    previous_events = {view.name: previous_events[view.name] if view.name in previous_events
+                       else load_previous_events(output_dir, view)
+                       for view in VIEWS if view.calendar == calendar and view.notify}
+    return process_calendar(calendar, events, previous_events, result)
 
-    # Ledy - Hrdina
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['Hrdina'], f'{output_dir}/hrdina-la.txt')
-    generate_html_from_text_file(output_dir, 'hrdina-la.txt', 'hrdina-la.html', 'Ledy na jméno Hrdina v Lanškrouně')
 
-    # Volné bruslení
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['volné bruslení'], f'{output_dir}/brusleni-la.txt')
-    generate_html_from_text_file(output_dir, 'brusleni-la.txt', 'brusleni-la.html', 'Volné bruslení v Lanškrouně')
-    print_specific_events_to_textfile(upcoming_events_ceska_trebova, ['VEŘEJNÉ BRUSLENÍ'],
-                                      output_dir + '/' + 'brusleni-ct.txt')
-    generate_html_from_text_file(output_dir, 'brusleni-ct.txt', 'brusleni-ct.html', 'Volné bruslení v České Třebové')
+_worker_store = None
 
-    # Ledy - Bystřec
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['Bystřec'], f'{output_dir}/bystrec-la.txt')
-    generate_html_from_text_file(output_dir, 'bystrec-la.txt', 'bystrec-la.html', 'Ledy na jméno Bystřec v Lanškrouně')
-    print_specific_events_to_textfile(upcoming_events_ceska_trebova, ['Bystřec'], f'{output_dir}/bystrec-ct.txt')
-    generate_html_from_text_file(output_dir, 'bystrec-ct.txt', 'bystrec-ct.html',
-                                 'Ledy na jméno Bystřec v České Třebové')
-    # Ledy - Bys
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['Bys'], f'{output_dir}/bys.txt')
-    generate_html_from_text_file(output_dir, 'bys.txt', 'bys.html', 'Ledy na jméno Bystřec v Lanškrouně')
+
+def init_worker(config_path, calendars, views, available_pages):
+    global _worker_store
+    try:
+        setup(config_path)
+    except locale.Error as exp:
+        # rodic uz bezi, bez ceskeho locale se lisi jen nazvy dnu ve vystupech
+        logging.warning(f'Worker locale not set: {repr(exp)}')
+    # tabulky rodice, i kdyz je nekdo zmenil za behu (benchmark)
+    CALENDARS.clear()
+    CALENDARS.update(calendars)
+    VIEWS[:] = views
+    AVAILABLE_PAGES[:] = available_pages
+    # jedno spojeni na proces po celou dobu jeho zivota, SQLite zapisy serializuje
+    _worker_store = EventStore(get_history_path(config))
+
+
+def shard_in_worker(calendar, digest=None):
+    get_report().reset()
+    result = shard_calendar(calendar, digest, _worker_store)
+    result.stages = get_report().as_dict()['stages']
+    return result
+
+
+def create_executor(config_path):
+    """Process pool for the shards when WORKERS is set, None to run them in threads of this process."""
+    workers = int(config['GENERAL'].get('WORKERS') or 0)
+    if workers < 1:
+        return None
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn: rodic muze mit otevrena spojeni a bezici vlakna, fork by je zdedil
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=(config_path, dict(CALENDARS), list(VIEWS), list(AVAILABLE_PAGES))
+    )
 
 
-    # Příchozí
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['příchozí'], f'{output_dir}/prichozi-la.txt')
-    generate_html_from_text_file(output_dir, 'prichozi-la.txt', 'prichozi-la.html', 'Hokej pro příchozí v Lanškrouně')
-    print_specific_events_to_textfile(upcoming_events_ceska_trebova, ['příchozí'], f'{output_dir}/prichozi-ct.txt')
-    generate_html_from_text_file(output_dir, 'prichozi-ct.txt', 'prichozi-ct.html',
-                                 'Hokej pro příchozí v České Třebové')
+def run_shards(calendars, digests=None, executor=None, store=None, previous_events=None):
+    """shard_calendar() of all calendars at once, in worker processes when executor is given.
+
+    Without executor the calendars are fetched in threads and processed in the calling thread, with store
+    and previous_events of a warm daemon when given. Worker processes keep their own connection and read
+    the snapshots.
+    """
+    digests = digests or {}
+    if executor is not None:
+        results = list(executor.map(shard_in_worker, calendars, [digests.get(calendar) for calendar in calendars]))
+        for result in results:
+            get_report().merge(result.stages)
+        return results
+
+    fetched = fetch_concurrently(lambda calendar: get_events_from_calendar(CALENDARS[calendar]), calendars)
+    # spojeni SQLite patri vlaknu, ktere ho otevrelo
+    own_store = store is None
+    if own_store:
+        store = EventStore(get_history_path(config))
+    try:
+        return [process_shard(calendar, events, digests.get(calendar), store, previous_events)
+                for calendar, events in zip(calendars, fetched)]
+    finally:
+        if own_store:
+            store.close()
 
-    # Naše LHL a CHL zápasy
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['Bystřec', 'LHL'],
-                                      f'{output_dir}/zapasy-lhl-bystrec.txt')
-    generate_html_from_text_file(output_dir, 'zapasy-lhl-bystrec.txt', 'zapasy-lhl-bystrec.html', 'Zápasy LHL')
-    print_specific_events_to_textfile(upcoming_events_ceska_trebova, ['CHL', 'Bystřec'],
-                                      f'{output_dir}/zapasy-chl-bystrec.txt')
-    generate_html_from_text_file(output_dir, 'zapasy-chl-bystrec.txt', 'zapasy-chl-bystrec.html', 'Zápasy CHL')
 
-    # LHL a CHL zápasy
-    print_specific_events_to_textfile(upcoming_events_lanskroun, ['LHL č.'], f'{output_dir}/zapasy-lhl.txt')
-    generate_html_from_text_file(output_dir, 'zapasy-lhl.txt', 'zapasy-lhl.html', 'Zápasy LHL')
-    print_specific_events_to_textfile(upcoming_events_ceska_trebova, ['CHL'], f'{output_dir}/zapasy-chl.txt')
-    generate_html_from_text_file(output_dir, 'zapasy-chl.txt', 'zapasy-chl.html', 'Zápasy CHL')
+def run_once(config_path):
+    executor = create_executor(config_path)
+    try:
+        results = run_shards(list(CALENDARS), executor=executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    outbox = Outbox(get_outbox_path(config))
+    publish_results(results, outbox)
+    pending = outbox.pending_count()
+    outbox.close()
+
+    # bez cekajicich notifikaci neni proc spoustet dalsi proces
+    if pending:
+        spawn_worker(config_path)
+    append_report(get_report_path(config), mode='once')
+
+
+def get_poll_interval(calendar):
+    section = config['DAEMON'] if config.has_section('DAEMON') else {}
+    return int(section.get('POLL_INTERVAL_{0}'.format(calendar.upper()), section.get('POLL_INTERVAL', POLL_INTERVAL)))
+
+
+def get_poll_jitter():
+    section = config['DAEMON'] if config.has_section('DAEMON') else {}
+    return int(section.get('POLL_JITTER', POLL_JITTER))
+
+
+def events_fingerprint(events):
+    return [(event.id,) + fingerprint(event) for event in events]
+
+
+def run_daemon(config_path):
+    """Poll calendars on their own schedules, keeping workers, HTTP connections, history and snapshots warm.
+
+    Only calendars whose events changed since their last poll are processed and published. Queued notifications
+    are sent right away and retried on the backoff schedule of the outbox.
+    """
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info(f'Signal {signum} received, stopping')
+        stop.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    outbox = Outbox(get_outbox_path(config))
+    executor = create_executor(config_path)
+    # udalosti notifikovanych pohledu z posledniho behu; chybejici se nactou ze snapshotu
+    store = EventStore(get_history_path(config)) if executor is None else None
+    previous_events = {}
+    digests = {}
+    drainer = None
+    next_poll = {calendar: 0 for calendar in CALENDARS}
+    jitter = get_poll_jitter()
+
+    while not stop.is_set():
+        now = time.monotonic()
+        due = [calendar for calendar in CALENDARS if next_poll[calendar] <= now]
+        if due:
+            try:
+                results = run_shards(due, digests, executor, store, previous_events)
+            except Exception as exp:
+                logging.error(f'Processing {due} failed: {repr(exp)}')
+                results = []
+
+            for calendar in due:
+                next_poll[calendar] = now + get_poll_interval(calendar) + random.uniform(0, jitter)
+            changed = [result for result in results if result.digest != digests.get(result.calendar)]
+            for result in results:
+                digests[result.calendar] = result.digest
+
+            if changed:
+                try:
+                    previous_events.update(publish_results(changed, outbox))
+                except Exception as exp:
+                    logging.error(f'Publishing failed: {repr(exp)}')
+                append_report(get_report_path(config), mode='daemon', calendars=[result.calendar for result in changed])
+            # report se zapisuje jen po zpracovani zmen, aby soubor nerostl s kazdym dotazem
+            get_report().reset()
+
+        # neodeslane notifikace se opakuji podle backoffu outboxu, i kdyz se kalendare uz nezmeni
+        next_drain = None
+        if drainer is None or not drainer.is_alive():
+            try:
+                next_drain = outbox.next_attempt()
+            except Exception as exp:
+                logging.error(f'Reading outbox failed: {repr(exp)}')
+            if next_drain is not None and next_drain <= time.time():
+                drainer = threading.Thread(target=drain_outbox, args=(config,), daemon=True)
+                drainer.start()
+        if drainer is not None and drainer.is_alive():
+            next_drain = time.time() + DRAIN_RECHECK
+
+        timeout = min(next_poll.values()) - time.monotonic()
+        if next_drain is not None:
+            timeout = min(timeout, next_drain - time.time())
+        stop.wait(max(timeout, 0))
+
+    if executor is not None:
+        executor.shutdown()
+    if store is not None:
+        store.close()
+    outbox.close()
 
-    # Available events
-    print_available_events_to_textfile(upcoming_events_lanskroun, f'{output_dir}/available-la.txt')
-    generate_html_from_text_file_available_events(output_dir, 'available-la.txt', 'available-la.html',
-                                                  'Volné termíny v Lanškrouně')
-    print_available_events_to_textfile(upcoming_events_ceska_trebova, f'{output_dir}/available-ct.txt')
-    generate_html_from_text_file_available_events(output_dir, 'available-ct.txt', 'available-ct.html',
-                                                  'Volné termíny v České Třebové')
-
-    check_news(output_dir, 'hrdina-la.txt')
-    check_news(output_dir, 'bystrec-la.txt')
-    check_news(output_dir, 'bystrec-ct.txt')
-    check_news(output_dir, 'zapasy-lhl-bystrec.txt')
-    check_news(output_dir, 'zapasy-chl-bystrec.txt')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hockey-calendar-reader started')
+    parser.add_argument('--config', required=True, help='Path to config file')
+    parser.add_argument('--daemon', action='store_true', help='Keep running and poll calendars periodically')
+    parser.add_argument('--profile', metavar='PATH', help='Write cProfile stats of the run to PATH')
+    args = parser.parse_args()
+    setup(args.config)
+    logging.info('Bazoš started')
+
+    #clean_temp_files()
+
+    with profiled(args.profile):
+        if args.daemon:
+            run_daemon(args.config)
+        else:
+            run_once(args.config)
 
     logging.info('Script ended')
 
@@ -0,0 +1,56 @@
+import hashlib
+from string import Template
+
+# cas aktualizace se doplni az po porovnani obsahu, jinak by se stranka menila kazdym behem
+UPDATED_PLACEHOLDER = '\x00updated\x00'
+HASH_MARKER = '<!-- content-hash: {0} -->\n'
+
+PAGE = Template(
+    '<html>\n'
+    '<head>\n'
+    '<meta charset="UTF-8">\n'
+    '<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css" integrity="sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u" crossorigin="anonymous">'
+    '<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">'
+    '<script src="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/js/bootstrap.min.js" integrity="sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa" crossorigin="anonymous"></script>'
+    '<title>$headline</title>\n'
+    '</head>\n'
+    '<body>\n'
+    '<div style="text-align: center; align-self: center; margin: auto; align-content: center;">\n'
+    '<h2>$headline</h2>\n'
+    '<h4>Aktualizováno v $updated </h4>\n'
+    '<div class="panel panel-default" style="width: $width; align-self: center;margin: auto;">\n'
+    '<table class="table table-hover table-responsive table-bordered" style="width: 100%; margin: auto">\n'
+    '<tbody>\n'
+    '$rows'
+    '</tbody>'
+    '</table>\n'
+    '</div>\n'
+    '</div>\n'
+    '</body>\n'
+    '</html>\n'
+)
+EMPTY_ROW = '<tr><td colspan="3" style="text-align: center">Žádná požadovaná událost nebyla v kalendáři nalezena</td></tr>\n'
+
+
+class Table:
+    """Page layout compiled once: header row and a format string for one row."""
+
+    def __init__(self, header, row, width='90%'):
+        self.header = header
+        self.row = row
+        self.width = width
+
+    def render(self, headline, rows):
+        if rows:
+            body = self.header + ''.join([self.row.format(*row) for row in rows])
+        else:
+            body = EMPTY_ROW
+        return PAGE.substitute(headline=headline, updated=UPDATED_PLACEHOLDER, width=self.width, rows=body)
+
+
+def page_marker(page):
+    return HASH_MARKER.format(hashlib.sha256(page.encode('utf-8')).hexdigest())
+
+
+def fill_updated(page, updated):
+    return page.replace(UPDATED_PLACEHOLDER, updated.strftime('%A %d.%m.%Y %H:%M:%S'))
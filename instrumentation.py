@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+COUNTERS = ('events', 'bytes_fetched', 'bytes_written')
+
+
+class RunReport:
+    """Wall time, call count, events and bytes per stage of one run. Safe to use from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._started_counter = time.perf_counter()
+            self.stages = {}
+
+    def add(self, name, seconds=0.0, calls=0, **counters):
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = dict.fromkeys(COUNTERS, 0)
+                stats.update(calls=0, seconds=0.0)
+                self.stages[name] = stats
+            stats['calls'] += calls
+            stats['seconds'] += seconds
+            for key, value in counters.items():
+                stats[key] = stats.get(key, 0) + value
+
+    def merge(self, stages):
+        """Add stages of a report from another process (as_dict()['stages'])."""
+        for name, stats in stages.items():
+            self.add(name, **stats)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'seconds': round(time.perf_counter() - self._started_counter, 6),
+                'stages': {name: dict(stats, seconds=round(stats['seconds'], 6)) for name, stats in self.stages.items()}
+            }
+
+
+_report = RunReport()
+
+
+def get_report():
+    return _report
+
+
+def count(name, **counters):
+    _report.add(name, **counters)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as one call of stage name, counters set on the yielded dict are added to the stage."""
+    counters = {}
+    start = time.perf_counter()
+    try:
+        yield counters
+    finally:
+        _report.add(name, seconds=time.perf_counter() - start, calls=1, **counters)
+
+
+def append_report(path, **extra):
+    """Append the report as one JSON line, so runs can be compared with each other."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    report = _report.as_dict()
+    report.update(extra)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False) + '\n')
+    return report
+
+
+@contextmanager
+def profiled(path):
+    """Dump cProfile stats of the block to path, does nothing when path is empty."""
+    if not path:
+        yield
+        return
+
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
@@ -0,0 +1,115 @@
+import logging
+import smtplib
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from instrumentation import stage
+
+DIGEST_SUBJECT = 'Hockey Calendar Reader - Změny v kalendáři ({0})'
+DIGEST_SEPARATOR = '<br>\n<hr>\n'
+
+
+def build_message(sender, recipients, subject, content):
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = sender
+    message["To"] = ", ".join(recipients)
+
+    # Přidání HTML obsahu
+    message.attach(MIMEText(content, "html"))
+    return message
+
+
+class MailDispatcher:
+    """Collects notifications of a run and delivers them over one SMTP connection.
+
+    In digest mode all notifications are folded into a single message for every recipient. Delivery is tracked
+    per recipient, so a notification is retried only for those who did not get it.
+    """
+
+    def __init__(self, sender, recipients, server, port, login=None, password=None, starttls=True, digest=False):
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.server = server
+        self.port = port
+        self.login = login
+        self.password = password
+        self.starttls = starttls
+        self.digest = digest
+        self.pending = []
+
+    @classmethod
+    def from_config(cls, section, recipients):
+        return cls(
+            sender=section['SENDER'],
+            recipients=recipients,
+            server=section['SMTP_SERVER'],
+            port=int(section['SMTP_PORT']),
+            login=section.get('SMTP_LOGIN') or None,
+            password=section.get('SMTP_PASSWORD') or None,
+            starttls=section.getboolean('SMTP_STARTTLS', fallback=True),
+            digest=section.getboolean('DIGEST', fallback=False)
+        )
+
+    def add(self, subject, content, delivered=()):
+        """Queue a notification, recipients in delivered already got it and are skipped."""
+        self.pending.append((subject, content, frozenset(delivered)))
+
+    def messages(self):
+        """List of (recipients, indexes of the pending notifications, message) to send."""
+        if not self.digest:
+            messages = []
+            for i, (subject, content, delivered) in enumerate(self.pending):
+                recipients = [recipient for recipient in self.recipients if recipient not in delivered]
+                if recipients:
+                    messages.append((recipients, [i], build_message(self.sender, recipients, subject, content)))
+            return messages
+
+        # kazdy prijemce dostane jen notifikace, ktere mu zatim nebyly doruceny
+        digests = {}
+        messages = []
+        for recipient in self.recipients:
+            items = tuple(i for i, (_, _, delivered) in enumerate(self.pending) if recipient not in delivered)
+            if not items:
+                continue
+            if items not in digests:
+                digests[items] = DIGEST_SEPARATOR.join(
+                    '<b>{0}</b><br>\n{1}'.format(self.pending[i][0], self.pending[i][1]) for i in items
+                )
+            subject = DIGEST_SUBJECT.format(len(items))
+            messages.append(([recipient], items, build_message(self.sender, [recipient], subject, digests[items])))
+        return messages
+
+    def flush(self):
+        """Send all pending notifications, returns the set of recipients that got each of them (in order)."""
+        messages = self.messages()
+        delivered = [set() for _ in self.pending]
+        self.pending = []
+        if not messages:
+            return delivered
+
+        sent = 0
+        with stage('send_email') as stats:
+            try:
+                with smtplib.SMTP(self.server, self.port) as server:
+                    if self.starttls:
+                        server.starttls()  # Zapnout TLS
+                    if self.login:
+                        server.login(self.login, self.password)
+                    for recipients, items, message in messages:
+                        try:
+                            # odmitnuti jen nekteri prijemci -> ostatnim je zprava dorucena
+                            refused = server.sendmail(self.sender, recipients, message.as_string())
+                        except smtplib.SMTPRecipientsRefused as exp:
+                            # spojeni je dal pouzitelne, dalsi prijemci zpravy dostanou
+                            logging.error(f"Recipients refused: {repr(exp)}")
+                            continue
+                        for i in items:
+                            delivered[i].update(recipient for recipient in recipients if recipient not in refused)
+                        sent += 1
+                logging.info(f'Sent {sent} emails')
+            except Exception as exp:
+                logging.error(f"Sending failed after {sent} of {len(messages)} emails: {repr(exp)}")
+            stats['events'] = sent
+
+        return delivered
@@ -1,25 +1,35 @@
 #!/usr/bin/env python3
 
-from icalendar import Calendar, Event
-import requests
+import argparse
 import datetime
-from dateutil.rrule import *
+import importlib.util
+import json
+import os
 import pytz
 import locale
-import os
-import smtplib
-from dateutil.parser import parse
-import re
-
-
-class Event:
-    def __init___(self, name, start_time, end_time, created, updated, id):
-        self.name = name
-        self.start_time = start_time
-        self.end_time = end_time
-        self.created = created
-        self.updated = updated
-        self.id = id
+import sys
+import time
+from pathlib import Path
+
+from boundaries import RULES_VERSION, get_boundary_calendar
+from calendar_api import API_URL, EVENT_FIELDS, ResponseCache, events_url, fetch_concurrently, iter_items
+from changes import fingerprint as event_fingerprint
+from date_parsing import parse_event_time, parse_rfc3339
+from events import Event, to_epoch
+from history import EventStore
+from paths import default_cache_dir
+from html_render import Table
+from publisher import OutputPublisher
+from teams import TEAMS_FILE, get_registry, load_registry, match_teams, new_team
+
+
+SEASON_START = datetime.datetime(2019, 9, 1)
+STATE_VERSION = 3
+# sekundy; zmeny zapsane soubeznym behem ctenare tesne pred checkpointem se nesmi ztratit
+CHECKPOINT_MARGIN = 60
+# okno uzavrene pred touto dobou se uz nemeni, nacita se jen z disku
+CLOSED_AFTER = datetime.timedelta(days=7)
+BACKFILL_WORKERS = 4
 
 
 class Team_Stat:
@@ -29,49 +39,118 @@ class Team_Stat:
         self.count = 0
 
 
-def get_events_from_calendar(calendar_id):
+def season_params(time_min, time_max=None):
     api_key = ''
-    url = 'https://www.googleapis.com/calendar/v3/calendars/' + calendar_id + '/events'
 
-    PARAMS = {
+    params = {
         'key': api_key,
         'singleEvents': 'True',
-        'timeMin': datetime.datetime(2019, 9, 1).isoformat() + 'Z',
+        'timeMin': time_min.isoformat() + 'Z',
         'orderBy': 'startTime',
-        'maxResults': 2500
+        'maxResults': 2500,
+        'fields': EVENT_FIELDS
     }
+    if time_max is not None:
+        params['timeMax'] = time_max.isoformat() + 'Z'
+    return params
+
 
-    events = requests.get(url=url, params=PARAMS).json()['items']
+def iter_season_events(calendar_id, api_url=API_URL, cache=None):
+    url = events_url(calendar_id, api_url)
+    return events_from_items(iter_items(url, season_params(SEASON_START), cache))
 
-    all_events = []
-    for event in events:
+
+def events_from_items(items):
+    for event in items:
         if 'summary' not in event.keys():
             continue
         if event['status'] == 'cancelled':
             continue
-        if 'LHL' not in event['summary']:
-            continue
-        if 'dateTime' in event['start']:
-            start_time = parse(event['start']['dateTime'])
+        start_time = parse_event_time(event['start'])
+        end_time = parse_event_time(event['end'])
+
+        yield Event(
+            name=event['summary'],
+            start_time=start_time,
+            end_time=end_time,
+            created=parse_rfc3339(event['created']),
+            updated=parse_rfc3339(event['updated']),
+            id=event['id']
+        )
+
+
+def iter_windows(start, end, period='month'):
+    """[window_start, window_end) ranges from start until the one containing end, by month or by season."""
+    window_start = start
+    while window_start <= end:
+        if period == 'season':
+            window_end = datetime.datetime(window_start.year + (window_start.month >= 9), 9, 1)
         else:
-            start_time = parse(event['start']['date'])
+            window_end = datetime.datetime(window_start.year + window_start.month // 12, window_start.month % 12 + 1, 1)
+        yield window_start, window_end
+        window_start = window_end
 
-        if 'dateTime' in event['end']:
-            end_time = parse(event['end']['dateTime'])
-        else:
-            end_time = parse(event['end']['date'])
 
-        tmp_event = Event()
-        tmp_event.id = event['id']
-        tmp_event.name = event['summary']
-        tmp_event.start_time = start_time
-        tmp_event.end_time = end_time
-        tmp_event.created = parse(event['created'])
-        tmp_event.updated = parse(event['updated'])
+def window_path(directory, calendar_id, window):
+    return Path(directory) / '{0}_{1:%Y-%m-%d}_{2:%Y-%m-%d}.json'.format(calendar_id, *window)
+
+
+def fetch_window(calendar_id, window, directory, now, api_url=API_URL, cache=None):
+    """Raw items of calendar_id in window (window_end None for no timeMax).
+
+    A window closed for CLOSED_AFTER is fetched once and then read from directory only.
+    """
+    window_start, window_end = window
+    path = None
+    if window_end is not None and window_end + CLOSED_AFTER <= now:
+        path = window_path(directory, calendar_id, window)
+        if path.is_file():
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
 
-        all_events.append(tmp_event)
+    items = list(iter_items(events_url(calendar_id, api_url), season_params(window_start, window_end), cache))
+    if path is not None:
+        save_json(path, items)
+    return items
 
-    return all_events
+
+def backfill_season_events(calendar_id, directory, period='month', api_url=API_URL, now=None):
+    """Events since SEASON_START like iter_season_events(), fetched per month or season in parallel.
+
+    Open windows are revalidated through the response cache in directory, closed ones are not requested again.
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    windows = list(iter_windows(SEASON_START, now, period))
+    # budouci udalosti bez timeMax
+    windows.append((windows[-1][1], None))
+
+    cache = ResponseCache(Path(directory) / 'http')
+    fetched = fetch_concurrently(lambda window: fetch_window(calendar_id, window, directory, now, api_url, cache),
+                                 windows, BACKFILL_WORKERS)
+
+    # udalost pres hranici oken prijde dvakrat; prvni vyskyt drzi poradi podle startTime
+    merged = {}
+    for items in fetched:
+        for item in items:
+            merged.setdefault(item['id'], item)
+    return list(events_from_items(merged.values()))
+
+
+def is_league_match(event):
+    return 'LHL' in event.name
+
+
+def get_events_from_calendar(calendar_id, api_url=API_URL):
+    return filter(is_league_match, iter_season_events(calendar_id, api_url))
+
+
+def save_json(path, data):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = '{0}.tmp'.format(path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
 
 def get_time_interval(given_datetime):
@@ -89,255 +168,299 @@ def get_time_interval(given_datetime):
         return '22-23'
 
 
-def print_to_text_file(teams, file_location):
-    with open(file_location, 'w', encoding='utf-8') as f:
-        for team in teams.keys():
-            f.write('{0};{1};'.format(teams[team]['name'], teams[team]['matches_count']))
-            for day_interval in teams[team]['days'].keys():
-                f.write('{0};'.format(teams[team]['days'][day_interval]))
-
-            for hour_interval in teams[team]['hours'].keys():
-                f.write('{0};'.format(teams[team]['hours'][hour_interval]))
-            f.write('{0};'.format(teams[team]['late_minutes']))
-            f.write('\n')
-
-
-def generate_html_days(prefix_path, source_file, output_file, headline):
-    loaded_lines = open('{0}/{1}'.format(prefix_path, source_file), 'r', encoding='utf-8').readlines()
-
-    with open('{0}/{1}'.format(prefix_path, output_file), 'w', encoding='utf-8') as f:
-        f.write('<html>\n')
-        f.write('<head>\n')
-        f.write('<meta charset="UTF-8">\n')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css" integrity="sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u" crossorigin="anonymous">')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">')
-        f.write('<script src="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/js/bootstrap.min.js" integrity="sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa" crossorigin="anonymous"></script>')
-        f.write('<title>{0}</title>\n'.format(headline))
-        f.write('</head>\n')
-        f.write('<body>\n')
-        f.write('<div style="text-align: center; align-self: center; margin: auto; align-content: center;">\n')
-        f.write('<h2>{0}</h2>\n'.format(headline))
-        f.write('<h4>Aktualizováno v {0} </h4>\n'.format(datetime.datetime.now().strftime('%A %d.%m.%Y %H:%M:%S')))
-        f.write('<div class="panel panel-default" style="width: 90%; align-self: center;margin: auto;">\n')
-        f.write('<table class="table table-hover table-responsive table-bordered" style="width: 100%; margin: auto">\n')
-        f.write('<tbody>\n')
-        if len(loaded_lines) == 0:
-            f.write('<tr><td colspan="3" style="text-align: center">Žádná požadovaná událost nebyla v kalendáři nalezena</td></tr>\n')
-        else:
-            f.write('<tr class="info"><th>Tým</th><th>Zápasy</th><th>Pondělí</th><th>Úterý</th><th>Středa</th><th>Čtvrtek</th><th>Pátek</th><th>Sobota</th><th>Neděle</th></tr>')
-        for line in loaded_lines:
-            splitted = line.split(';')
-            f.write(
-                '<tr>'
-                '<td>{0}</td><td>{1}</td><td>{2}</td><td>{3}</td><td>{4}</td><td>{5}</td><td>{6}</td><td>{7}</td><td>{8}</td>'
-                '</tr>\n'
-                    .format(splitted[0], splitted[1], splitted[2], splitted[3], splitted[4], splitted[5], splitted[6], splitted[7], splitted[8]))
-
-        f.write('</tbody>')
-        f.write('</table>\n')
-        f.write('</div>\n')
-        f.write('</div>\n')
-        f.write('</body>\n')
-        f.write('</html>\n')
-
-
-def generate_html_hours(prefix_path, source_file, output_file, headline):
-    loaded_lines = open('{0}/{1}'.format(prefix_path, source_file), 'r', encoding='utf-8').readlines()
-
-    with open('{0}/{1}'.format(prefix_path, output_file), 'w', encoding='utf-8') as f:
-        f.write('<html>\n')
-        f.write('<head>\n')
-        f.write('<meta charset="UTF-8">\n')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css" integrity="sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u" crossorigin="anonymous">')
-        f.write('<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">')
-        f.write('<script src="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/js/bootstrap.min.js" integrity="sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa" crossorigin="anonymous"></script>')
-        f.write('<title>{0}</title>\n'.format(headline))
-        f.write('</head>\n')
-        f.write('<body>\n')
-        f.write('<div style="text-align: center; align-self: center; margin: auto; align-content: center;">\n')
-        f.write('<h2>{0}</h2>\n'.format(headline))
-        f.write('<h4>Aktualizováno v {0} </h4>\n'.format(datetime.datetime.now().strftime('%A %d.%m.%Y %H:%M:%S')))
-        f.write('<div class="panel panel-default" style="width: 90%; align-self: center;margin: auto;">\n')
-        f.write('<table class="table table-hover table-responsive table-bordered" style="width: 100%; margin: auto">\n')
-        f.write('<tbody>\n')
-        if len(loaded_lines) == 0:
-            f.write('<tr><td colspan="3" style="text-align: center">Žádná požadovaná událost nebyla v kalendáři nalezena</td></tr>\n')
-        else:
-            f.write('<tr class="info"><th>Tým</th><th>Zápasy</th><th>6-10h</th><th>10-12h</th><th>12-20h</th><th>20-22h</th><th>22h-</th></tr>')
-        for line in loaded_lines:
-            splitted = line.split(';')
-            f.write(
-                '<tr>'
-                '<td>{0}</td><td>{1}</td><td>{2}</td><td>{3}</td><td>{4}</td><td>{5}</td><td>{6}</td>'
-                '</tr>\n'
-                    .format(splitted[0], splitted[1], splitted[9], splitted[10], splitted[11], splitted[12], splitted[13]))
-
-        f.write('</tbody>')
-        f.write('</table>\n')
-        f.write('</div>\n')
-        f.write('</div>\n')
-        f.write('</body>\n')
-        f.write('</html>\n')
-
-
-def generate_html_late_minutes(prefix_path, source_file, output_file, headline):
-    loaded_lines = open('{0}/{1}'.format(prefix_path, source_file), 'r', encoding='utf-8').readlines()
-
-    teams = []
-    for line in loaded_lines:
-        splitted = line.split(';')
-        teams.append((splitted[0], int(splitted[14])))
-
-    teams.sort(key=lambda tup: tup[1], reverse=True)
-
-    with open('{0}/{1}'.format(prefix_path, output_file), 'w', encoding='utf-8') as f:
-        f.write('<html>\n')
-        f.write('<head>\n')
-        f.write('<meta charset="UTF-8">\n')
-        f.write(
-            '<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap.min.css" integrity="sha384-BVYiiSIFeK1dGmJRAkycuHAHRg32OmUcww7on3RYdg4Va+PmSTsz/K68vbdEjh4u" crossorigin="anonymous">')
-        f.write(
-            '<link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">')
-        f.write(
-            '<script src="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/js/bootstrap.min.js" integrity="sha384-Tc5IQib027qvyjSMfHjOMaLkfuWVxZxUPnCJA7l2mCWNIpG9mGCD8wGNIcPD7Txa" crossorigin="anonymous"></script>')
-        f.write('<title>{0}</title>\n'.format(headline))
-        f.write('</head>\n')
-        f.write('<body>\n')
-        f.write('<div style="text-align: center; align-self: center; margin: auto; align-content: center;">\n')
-        f.write('<h2>{0}</h2>\n'.format(headline))
-        f.write('<h4>Aktualizováno v {0} </h4>\n'.format(datetime.datetime.now().strftime('%A %d.%m.%Y %H:%M:%S')))
-        f.write('<div class="panel panel-default" style="width: 50%; align-self: center;margin: auto;">\n')
-        f.write('<table class="table table-hover table-responsive table-bordered" style="width: 100%; margin: auto">\n')
-        f.write('<tbody>\n')
-        if len(loaded_lines) == 0:
-            f.write(
-                '<tr><td colspan="3" style="text-align: center">Žádná požadovaná událost nebyla v kalendáři nalezena</td></tr>\n')
-        else:
-            f.write(
-                '<tr class="info"><th>Tým</th><th>Počet minut odehraných v pozdních hodinách</th></tr>')
-        for team in teams:
-            f.write(
-                '<tr><td>{0}</td><td>{1}</td>''</tr>\n'.format(team[0], team[1]))
-
-        f.write('</tbody>')
-        f.write('</table>\n')
-        f.write('</div>\n')
-        f.write('</div>\n')
-        f.write('</body>\n')
-        f.write('</html>\n')
-
-
-def fix_inconsistent_team_names(given_name):
-    if given_name == 'Trnávka':
-        return 'Udánky'
-    if given_name == 'Snakes':
-        return 'Snakes D.Dobrouč'
-    if given_name == 'H.Třešňovec':
-        return 'Horní Třešňovec'
-    if given_name == 'Horní Čerrmná':
-        return 'Horní Čermná'
-    if given_name == 'Slámožrouti':
-        return 'Slámožrouti Kunvald'
-    if given_name == 'Klášterec':
-        return 'Sokol Klášterec'
-    if given_name == 'Sloni':
-        return 'Sloni D. Morava'
-    if given_name == 'Wild Band':
-        return 'Wild Band Zábřeh'
-    if given_name.startswith('LDM'):
-        return 'LDM'
-
-    return given_name
-
-
-def late_minutes(start_time, end_time):
-    holidays = [
-        datetime.date(2019, 9, 28),
-        datetime.date(2019, 10, 28),
-        datetime.date(2019, 11, 17),
-        datetime.date(2019, 12, 24),
-        datetime.date(2019, 12, 25),
-        datetime.date(2019, 12, 26),
-        datetime.date(2020, 1, 1)
-    ]
-
-    # weekday 0-po, ... 6-ne
-
-    second_day = end_time + datetime.timedelta(days=1)
-    boundary_before_freeday = 23
-    boundary_before_workday = 22
-
-    # Druhy den je sobota nebo nedele, nebo svatek
-    holiday_check = datetime.date(second_day.year, second_day.month, second_day.day) in holidays
-    if second_day.weekday() in [5,6] or holiday_check:
-        boundary = datetime.datetime(end_time.year, end_time.month, end_time.day, boundary_before_freeday, 0, 0)
-    else:
-        boundary = datetime.datetime(end_time.year, end_time.month, end_time.day, boundary_before_workday, 0, 0)
+def print_to_text_file(teams, publisher, filename):
+    lines = []
+    for team in teams.keys():
+        line = '{0};{1};'.format(teams[team]['name'], teams[team]['matches_count'])
+        for day_interval in teams[team]['days'].keys():
+            line += '{0};'.format(teams[team]['days'][day_interval])
 
-    if start_time.replace(tzinfo=None) > boundary:
-        boundary = datetime.datetime(end_time.year, end_time.month, end_time.day, start_time.hour, start_time.minute, start_time.second)
+        for hour_interval in teams[team]['hours'].keys():
+            line += '{0};'.format(teams[team]['hours'][hour_interval])
+        line += '{0};'.format(teams[team]['late_minutes'])
+        lines.append(line + '\n')
 
-    if boundary >= end_time.replace(tzinfo=None):
-        return 0
-    else:
-        return int((end_time.replace(tzinfo=None) - boundary).seconds / 60)
+    publisher.text(filename, ''.join(lines))
 
 
-def main():
-    locale.setlocale(locale.LC_ALL, "cs_CZ.UTF-8")
-    global local_tz
-    local_tz = pytz.timezone('Europe/Prague')
+DAYS_TABLE = Table(
+    '<tr class="info"><th>Tým</th><th>Zápasy</th><th>Pondělí</th><th>Úterý</th><th>Středa</th><th>Čtvrtek</th><th>Pátek</th><th>Sobota</th><th>Neděle</th></tr>',
+    '<tr>'
+    '<td>{0}</td><td>{1}</td><td>{2}</td><td>{3}</td><td>{4}</td><td>{5}</td><td>{6}</td><td>{7}</td><td>{8}</td>'
+    '</tr>\n'
+)
+HOURS_TABLE = Table(
+    '<tr class="info"><th>Tým</th><th>Zápasy</th><th>6-10h</th><th>10-12h</th><th>12-20h</th><th>20-22h</th><th>22h-</th></tr>',
+    '<tr>'
+    '<td>{0}</td><td>{1}</td><td>{2}</td><td>{3}</td><td>{4}</td><td>{5}</td><td>{6}</td>'
+    '</tr>\n'
+)
+LATE_MINUTES_TABLE = Table(
+    '<tr class="info"><th>Tým</th><th>Počet minut odehraných v pozdních hodinách</th></tr>',
+    '<tr><td>{0}</td><td>{1}</td></tr>\n',
+    width='50%'
+)
 
-    LA_calendar_id = 'halabmlan@gmail.com'
 
-    events = get_events_from_calendar(LA_calendar_id)
+def generate_html_days(publisher, teams, output_file, headline):
+    rows = [[team['name'], team['matches_count']] + list(team['days'].values()) for team in teams.values()]
+    publisher.page(output_file, DAYS_TABLE.render(headline, rows))
 
-    regex = re.compile(r'.*\d+(.*)\\(.*)\d\.liga')
 
-    teams = {}
+def generate_html_hours(publisher, teams, output_file, headline):
+    rows = [[team['name'], team['matches_count']] + list(team['hours'].values()) for team in teams.values()]
+    publisher.page(output_file, HOURS_TABLE.render(headline, rows))
 
-    for event in events:
-        matched = regex.match(event.name)
-        if matched is None:
-            continue
 
-        team1 = fix_inconsistent_team_names(matched.group(1).replace('!', '').strip())
-        team2 = fix_inconsistent_team_names(matched.group(2).strip())
+def generate_html_late_minutes(publisher, teams, output_file, headline):
+    rows = [(team['name'], team['late_minutes']) for team in teams.values()]
+    rows.sort(key=lambda tup: tup[1], reverse=True)
+    publisher.page(output_file, LATE_MINUTES_TABLE.render(headline, rows))
 
-        day1 = {'0' : 0, '1': 0, '2': 0, '3': 0, '4': 0, '5': 0, '6': 0}
-        day2 = {'0' : 0, '1': 0, '2': 0, '3': 0, '4': 0, '5': 0, '6': 0}
 
-        hour_1 = {'6-10': 0, '10-12': 0, '12-20': 0, '20-22': 0, '22-23': 0}
-        hour_2 = {'6-10': 0, '10-12': 0, '12-20': 0, '20-22': 0, '22-23': 0}
+def late_minutes(start_time, end_time):
+    # po 22h pred pracovnim dnem, po 23h pred vikendem nebo svatkem
+    return get_boundary_calendar().late_minutes(start_time, end_time)
+
+
+def match_contribution(event):
+    """What one match adds to the totals of both its teams, None for events that are not matches."""
+    matched = match_teams(event.name)
+    if matched is None:
+        return None
+    return {
+        'teams': list(matched),
+        'start': to_epoch(event.start_time),
+        'day': str(event.start_time.weekday()),
+        'hours': get_time_interval(event.start_time),
+        'late_minutes': late_minutes(event.start_time, event.end_time)
+    }
 
-        tmp_team1 = {'name': team1, 'matches_count': 1, 'days': day1, 'hours': hour_1, 'late_minutes': 0}
-        tmp_team2 = {'name': team2, 'matches_count': 1, 'days': day2, 'hours': hour_2, 'late_minutes': 0}
 
-        if team1 not in teams.keys():
-            teams[team1] = tmp_team1
+class SeasonAggregate:
+    """Per-team running totals of the season, updated by folding in added, changed and removed matches only.
+
+    Every counted match keeps its fingerprint and contribution, so a moved or renamed match is retracted
+    before its new version is added. The state can be saved between runs together with a checkpoint
+    of the event store. Contributions keep resolved team names, so a state saved with another fingerprint
+    (see state_fingerprint()) is not loaded and the season is folded in again.
+    """
+
+    def __init__(self, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.matches = {}
+        self.totals = {}
+        self.first = {}
+        self.checkpoint = None
+        self._stale_first = set()
+
+    def _apply(self, id, contribution, sign):
+        order = [contribution['start'], id]
+        for side, team in enumerate(contribution['teams']):
+            totals = self.totals.get(team)
+            if totals is None:
+                totals = self.totals[team] = new_team(team)
+            totals['matches_count'] += sign
+            totals['days'][contribution['day']] += sign
+            totals['hours'][contribution['hours']] += sign
+            totals['late_minutes'] += sign * contribution['late_minutes']
+
+            # poradi tymu podle prvniho zapasu, jako pri postupnem pruchodu sezonou
+            key = order + [side]
+            if sign > 0 and (team not in self.first or key < self.first[team]):
+                self.first[team] = key
+            elif sign < 0 and self.first.get(team) == key:
+                self._stale_first.add(team)
+            if totals['matches_count'] == 0:
+                del self.totals[team]
+                self.first.pop(team, None)
+                self._stale_first.discard(team)
+
+    def fold(self, event):
+        """Add or replace one match, retract it when the event is not a match anymore. Returns True on change."""
+        fingerprint = list(event_fingerprint(event))
+        known = self.matches.get(event.id)
+        if known is not None and known[0] == fingerprint:
+            return False
+
+        contribution = match_contribution(event)
+        if known is not None:
+            self.retract(event.id)
+        if contribution is not None:
+            self._apply(event.id, contribution, 1)
+            self.matches[event.id] = [fingerprint, contribution]
+        return known is not None or contribution is not None
+
+    def retract(self, id):
+        known = self.matches.pop(id, None)
+        if known is None:
+            return False
+        self._apply(id, known[1], -1)
+        return True
+
+    def replace_all(self, events):
+        """Make the totals match exactly events, returns the number of folded changes."""
+        changes = 0
+        seen = set()
+        for event in events:
+            seen.add(event.id)
+            changes += self.fold(event)
+        for id in [id for id in self.matches if id not in seen]:
+            changes += self.retract(id)
+        return changes
+
+    def teams(self):
+        """Totals in the format of the output functions, teams ordered by their first match."""
+        if self._stale_first:
+            for team in self._stale_first:
+                self.first[team] = min(
+                    [contribution['start'], id, side]
+                    for id, (_, contribution) in self.matches.items()
+                    for side, name in enumerate(contribution['teams']) if name == team
+                )
+            self._stale_first = set()
+        return {team: self.totals[team] for team in sorted(self.totals, key=self.first.__getitem__)}
+
+    @classmethod
+    def load(cls, path, fingerprint=None):
+        aggregate = cls(fingerprint)
+        try:
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return aggregate
+        if state.get('version') != STATE_VERSION or state.get('fingerprint') != fingerprint:
+            return aggregate
+        aggregate.matches = state['matches']
+        aggregate.totals = state['totals']
+        aggregate.first = state['first']
+        aggregate.checkpoint = state['checkpoint']
+        return aggregate
+
+    def save(self, path):
+        self.teams()
+        state = {
+            'version': STATE_VERSION,
+            'fingerprint': self.fingerprint,
+            'checkpoint': self.checkpoint,
+            'matches': self.matches,
+            'totals': self.totals,
+            'first': self.first
+        }
+        save_json(path, state)
+
+
+def state_fingerprint(registry):
+    """What the saved contributions depend on besides the events: late boundary rules and team spellings."""
+    return '{0}-{1}'.format(RULES_VERSION, registry.fingerprint())
+
+
+def aggregate_teams(events):
+    aggregate = SeasonAggregate()
+    aggregate.replace_all(events)
+    return aggregate.teams()
+
+
+def season_teams(events):
+    """aggregate_teams() of events, computed by team_stats.py when NumPy is installed."""
+    if importlib.util.find_spec('numpy') is None:
+        return aggregate_teams(events)
+    from team_stats import aggregate_teams_vectorized
+    return aggregate_teams_vectorized(list(events))
+
+
+def fold_season_event(aggregate, event):
+    if is_league_match(event) and to_epoch(event.start_time) >= to_epoch(SEASON_START):
+        return aggregate.fold(event)
+    return aggregate.retract(event.id)
+
+
+def update_from_history(aggregate, calendar_id, path, offline=False, backfill=None):
+    """Bring aggregate up to date with the event store at path, refreshed from the API first unless offline.
+
+    backfill ('month' or 'season') fetches the refresh per window, see backfill_season_events().
+
+    Without a checkpoint the whole season is folded in, later only events changed since the checkpoint.
+    """
+    store = EventStore(path)
+    try:
+        if not offline and backfill:
+            events = backfill_season_events(calendar_id, Path(path).with_name('backfill'), backfill)
+            store.sync(calendar_id, events, since=SEASON_START)
+        elif not offline:
+            # dotaz od zacatku sezony se nemeni, nezmeneny kalendar se jen revaliduje pres ETag
+            cache = ResponseCache(Path(path).with_name('http'))
+            store.sync(calendar_id, list(iter_season_events(calendar_id, cache=cache)), since=SEASON_START)
+        checkpoint = time.time()
+        if aggregate.checkpoint is None:
+            changes = aggregate.replace_all(
+                event for event in store.events(calendar_id, start=SEASON_START) if is_league_match(event)
+            )
         else:
-            teams[team1]['matches_count'] += 1
+            changed, deleted = store.changes_since(calendar_id, aggregate.checkpoint - CHECKPOINT_MARGIN)
+            changes = sum(fold_season_event(aggregate, event) for event in changed)
+            changes += sum(aggregate.retract(id) for id in deleted)
+        aggregate.checkpoint = checkpoint
+        return changes
+    finally:
+        store.close()
 
-        teams[team1]['days'][str(event.start_time.weekday())] += 1
-        teams[team1]['hours'][get_time_interval(event.start_time)] += 1
 
-        teams[team1]['late_minutes'] += late_minutes(event.start_time, event.end_time)
+def main():
+    parser = argparse.ArgumentParser(description='Generates stats about matches times of Lanškroun hockey league')
+    parser.add_argument('--history', metavar='PATH', help='Event store (history.sqlite of hockey_calendar_reader) to use')
+    parser.add_argument('--offline', action='store_true', help='Compute stats from --history only, without the API')
+    parser.add_argument('--state', metavar='PATH',
+                        help='Saved season totals, only changed matches are recomputed (default next to --history)')
+    parser.add_argument('--teams', metavar='PATH', default=TEAMS_FILE,
+                        help='Known teams and aliases of their spellings (default teams.ini)')
+    parser.add_argument('--backfill', choices=['month', 'season'],
+                        help='Fetch the season per month or per season in parallel, closed windows are kept on disk')
+    args = parser.parse_args()
+    if args.offline and not args.history:
+        parser.error('--offline requires --history')
 
-        if team2 not in teams.keys():
-            teams[team2] = tmp_team2
-        else:
-            teams[team2]['matches_count'] += 1
+    locale.setlocale(locale.LC_ALL, "cs_CZ.UTF-8")
+    global local_tz
+    local_tz = pytz.timezone('Europe/Prague')
+
+    registry = load_registry(args.teams)
+    LA_calendar_id = 'halabmlan@gmail.com'
 
-        teams[team2]['days'][str(event.start_time.weekday())] += 1
-        teams[team2]['hours'][get_time_interval(event.start_time)] += 1
-        teams[team2]['late_minutes'] += late_minutes(event.start_time, event.end_time)
+    state_path = args.state
+    if state_path is None and args.history:
+        state_path = str(Path(args.history).with_name('season-stats.json'))
+    aggregate = SeasonAggregate.load(state_path, state_fingerprint(registry)) if state_path else SeasonAggregate()
 
     prefix_path = '/var/www/my_web/hockey_events/'
 
-    print_to_text_file(teams, prefix_path + 'teams_dates.txt')
-    generate_html_days(prefix_path, 'teams_dates.txt', 'teams_dates.html', 'Zápasy v jednotlivé dny')
-    generate_html_hours(prefix_path, 'teams_dates.txt', 'teams_hours.html', 'Zápasy v jednotlivé hodiny')
-    generate_html_late_minutes(prefix_path, 'teams_dates.txt', 'teams_late_minutes.html', 'Čas odehraný v pozdních hodinách (po 22h před pracovním dnem, po 23h před volnem)')
+    if args.history:
+        update_from_history(aggregate, LA_calendar_id, args.history, args.offline, args.backfill)
+        events = None
+    elif args.backfill:
+        events = backfill_season_events(LA_calendar_id, '{0}/backfill'.format(default_cache_dir()), args.backfill)
+        events = filter(is_league_match, events)
+    else:
+        events = get_events_from_calendar(LA_calendar_id)
+
+    if state_path:
+        if events is not None:
+            aggregate.replace_all(events)
+        aggregate.save(state_path)
+        teams = aggregate.teams()
+    else:
+        # bez ulozeneho stavu se cela sezona pocita najednou
+        teams = season_teams(events)
+
+    with OutputPublisher(prefix_path) as publisher:
+        print_to_text_file(teams, publisher, 'teams_dates.txt')
+        generate_html_days(publisher, teams, 'teams_dates.html', 'Zápasy v jednotlivé dny')
+        generate_html_hours(publisher, teams, 'teams_hours.html', 'Zápasy v jednotlivé hodiny')
+        generate_html_late_minutes(publisher, teams, 'teams_late_minutes.html', 'Čas odehraný v pozdních hodinách (po 22h před pracovním dnem, po 23h před volnem)')
+
+    unknown = get_registry().unknown
+    if unknown:
+        print('Unknown team spellings, add them to {0}: {1}'.format(args.teams, ', '.join(sorted(unknown))), file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import argparse
+import configparser
+import fcntl
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from paths import get_cache_dir
+
+# sekundy, dalsi pokus po 1, 2, 4, ... minutach, nejdele po 6 hodinach
+BACKOFF_BASE = 60
+BACKOFF_MAX = 6 * 60 * 60
+# maximalni pocet notifikaci odeslanych jednim vyprazdnenim
+RATE_LIMIT = 50
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    sent REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (next_attempt) WHERE sent IS NULL;
+CREATE TABLE IF NOT EXISTS outbox_delivered (
+    outbox_id INTEGER NOT NULL,
+    recipient TEXT NOT NULL,
+    PRIMARY KEY (outbox_id, recipient)
+);
+'''
+
+
+def get_outbox_path(config):
+    return '{0}/outbox.sqlite'.format(get_cache_dir(config))
+
+
+def get_report_path(config):
+    return config['GENERAL'].get('RUN_REPORT') or '{0}/run-reports.jsonl'.format(get_cache_dir(config))
+
+
+class Outbox:
+    """Persistent queue of notifications, sent later by drain() so no change is lost when SMTP is down."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+
+    @property
+    def connection(self):
+        # databaze se otevre az s prvni notifikaci, bez zmen se sqlite vubec nenacita
+        if self._connection is None:
+            import sqlite3
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def put(self, subject, content, dedup_key):
+        # neodeslana notifikace se stejnym klicem se jen aktualizuje, novy obsah dostanou vsichni prijemci
+        now = time.time()
+        with self.connection:
+            updated = self.connection.execute(
+                'UPDATE outbox SET subject = ?, content = ? WHERE dedup_key = ? AND sent IS NULL',
+                (subject, content, dedup_key)
+            ).rowcount
+            if updated:
+                self.connection.execute(
+                    'DELETE FROM outbox_delivered WHERE outbox_id IN '
+                    '(SELECT id FROM outbox WHERE dedup_key = ? AND sent IS NULL)',
+                    (dedup_key,)
+                )
+            if not updated:
+                self.connection.execute(
+                    'INSERT INTO outbox (dedup_key, subject, content, created, next_attempt) VALUES (?, ?, ?, ?, ?)',
+                    (dedup_key, subject, content, now, now)
+                )
+
+    def pending_count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM outbox WHERE sent IS NULL').fetchone()[0]
+
+    def next_attempt(self):
+        """Time of the earliest attempt of a pending notification, None when nothing is pending."""
+        if self._connection is None and not Path(self.path).is_file():
+            return None
+        return self.connection.execute('SELECT MIN(next_attempt) FROM outbox WHERE sent IS NULL').fetchone()[0]
+
+    def drain(self, dispatcher, limit=RATE_LIMIT):
+        """Send due notifications through dispatcher, returns how many reached all recipients.
+
+        Recipients that got a notification are remembered, a retry with exponential backoff goes only to the rest.
+        """
+        now = time.time()
+        rows = self.connection.execute(
+            'SELECT id, subject, content, attempts FROM outbox '
+            'WHERE sent IS NULL AND next_attempt <= ? ORDER BY id LIMIT ?',
+            (now, limit)
+        ).fetchall()
+        if not rows:
+            return 0
+
+        delivered = {id: set() for id, _, _, _ in rows}
+        for id, recipient in self.connection.execute(
+                'SELECT outbox_id, recipient FROM outbox_delivered WHERE outbox_id IN ({0})'.format(
+                    ', '.join('?' * len(rows))),
+                list(delivered)):
+            delivered[id].add(recipient)
+
+        for id, subject, content, _ in rows:
+            dispatcher.add(subject, content, delivered[id])
+        received = dispatcher.flush()
+
+        sent = 0
+        recipients = set(dispatcher.recipients)
+        with self.connection:
+            for (id, _, _, attempts), got in zip(rows, received):
+                delivered[id] |= got
+                if delivered[id] >= recipients:
+                    self.connection.execute('UPDATE outbox SET sent = ? WHERE id = ?', (time.time(), id))
+                    self.connection.execute('DELETE FROM outbox_delivered WHERE outbox_id = ?', (id,))
+                    sent += 1
+                    continue
+
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO outbox_delivered (outbox_id, recipient) VALUES (?, ?)',
+                    [(id, recipient) for recipient in got]
+                )
+                delay = min(BACKOFF_BASE * 2 ** attempts, BACKOFF_MAX)
+                missing = ' '.join(sorted(recipients - delivered[id]))
+                self.connection.execute(
+                    'UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?',
+                    (attempts + 1, now + delay, 'not delivered to {0}'.format(missing), id)
+                )
+
+        return sent
+
+
+def drain_outbox(config):
+    path = get_outbox_path(config)
+    if not Path(path).is_file():
+        return 0
+
+    # jen jeden worker najednou, jinak by se emaily posilaly dvakrat
+    with open('{0}.lock'.format(path), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logging.info('Outbox is drained by another process')
+            return 0
+
+        from mailer import MailDispatcher
+
+        outbox = Outbox(path)
+        try:
+            dispatcher = MailDispatcher.from_config(config['EMAIL-BREVO'], config['GENERAL']['RECIPIENTS'].split(' '))
+            limit = config['EMAIL-BREVO'].getint('RATE_LIMIT', fallback=RATE_LIMIT)
+            return outbox.drain(dispatcher, limit)
+        finally:
+            outbox.close()
+
+
+def spawn_worker(config_path):
+    """Drain the outbox in a detached process so the calling run does not wait for SMTP."""
+    import subprocess
+
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--config', os.path.abspath(config_path)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sends pending notifications of hockey-calendar-reader')
+    parser.add_argument('--config', required=True, help='Path to config file')
+    args = parser.parse_args()
+    config = configparser.ConfigParser()
+    config.read(args.config, encoding='utf-8')
+    logging.basicConfig(filename=config['GENERAL']['LOG'], format='%(asctime)s %(levelname)s %(message)s', level=logging.DEBUG)
+    if drain_outbox(config):
+        from instrumentation import append_report
+        append_report(get_report_path(config), mode='outbox')
@@ -0,0 +1,27 @@
+import os
+import shutil
+from pathlib import Path
+
+APP_NAME = 'hockey-calendar-reader'
+
+
+def default_cache_dir():
+    # mimo OUTPUT_DIR, ktery obsluhuje webovy server
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, APP_NAME)
+
+
+def get_cache_dir(config):
+    """CACHE_DIR of config: sync state, snapshots, outbox, history and run reports."""
+    return config['GENERAL'].get('CACHE_DIR') or default_cache_dir()
+
+
+def migrate_cache_dir(config):
+    """Move the cache from OUTPUT_DIR/.cache, the default of older versions, to get_cache_dir(config) once."""
+    old_dir = Path(config['GENERAL']['OUTPUT_DIR']) / '.cache'
+    cache_dir = Path(get_cache_dir(config))
+    if not old_dir.is_dir() or cache_dir.exists() or old_dir.resolve() == cache_dir.resolve():
+        return False
+    cache_dir.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(old_dir), str(cache_dir))
+    return True
@@ -0,0 +1,148 @@
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+from html_render import fill_updated, page_marker
+from instrumentation import count
+
+STAGING_PREFIX = '.staging-'
+# sekundy; starsi staging adresare zbyly po padu behu
+STAGING_MAX_AGE = 60 * 60
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def staging_root(output_dir):
+    """Directory for staging next to output_dir, output_dir itself when the sibling is not usable."""
+    output_dir = os.path.abspath(output_dir)
+    root = os.path.join(os.path.dirname(output_dir), '.{0}.staging'.format(os.path.basename(output_dir)))
+    try:
+        os.makedirs(root, exist_ok=True)
+        # rename musi zustat na jednom souborovem systemu
+        if os.stat(root).st_dev == os.stat(output_dir).st_dev:
+            return root
+        os.rmdir(root)
+    except OSError:
+        pass
+    return output_dir
+
+
+def remove_stale_staging(root, max_age=STAGING_MAX_AGE):
+    limit = time.time() - max_age
+    for entry in os.scandir(root):
+        if entry.name.startswith(STAGING_PREFIX) and entry.is_dir() and entry.stat().st_mtime < limit:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class OutputPublisher:
+    """Stages changed output files of a run and publishes them by atomic renames.
+
+    Every file is replaced atomically, readers (the web server) see either its previous or its new version,
+    never a half-written one. The set as a whole is not atomic: files are renamed one after another
+    right after all of them were staged, so for that moment a reader can see new and old files side by side.
+    Unchanged files are not staged at all, so they keep their mtime.
+
+    Staging happens outside output_dir when its parent allows it, so unfinished files are not served;
+    staging directories left by a crashed run are removed after STAGING_MAX_AGE.
+    """
+
+    def __init__(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        root = staging_root(output_dir)
+        remove_stale_staging(root)
+        if root != os.path.abspath(output_dir):
+            # drivejsi verze stagingovaly primo v output_dir
+            remove_stale_staging(output_dir)
+        self.staging_dir = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=root)
+        self.staged = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.publish()
+        else:
+            self.discard()
+
+    def path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def _stage(self, name, data):
+        with open(os.path.join(self.staging_dir, name), 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.staged.append(name)
+        count('publish', bytes_written=len(data))
+
+    def text(self, name, content):
+        """Stage a text file unless the published one has the same content. Returns True if staged."""
+        data = content.encode('utf-8')
+        try:
+            with open(self.path(name), 'rb') as f:
+                if f.read() == data:
+                    return False
+        except FileNotFoundError:
+            pass
+
+        self._stage(name, data)
+        return True
+
+    def page(self, name, page, updated=None):
+        """Stage a rendered html page unless its content hash matches the published one."""
+        marker = page_marker(page)
+        try:
+            with open(self.path(name), 'r', encoding='utf-8') as f:
+                if f.readline() == marker:
+                    return False
+        except FileNotFoundError:
+            pass
+
+        if updated is None:
+            updated = datetime.datetime.now()
+        self._stage(name, (marker + fill_updated(page, updated)).encode('utf-8'))
+        return True
+
+    def publish(self):
+        for name in self.staged:
+            os.replace(os.path.join(self.staging_dir, name), self.path(name))
+        if self.staged:
+            _fsync_dir(self.output_dir)
+        published = self.staged
+        self.staged = []
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        return published
+
+    def discard(self):
+        self.staged = []
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+class RenderedFiles:
+    """Collects text files and pages like OutputPublisher, to be staged later by publish_to().
+
+    Lets a worker process render its part of the output and hand it to the process that publishes the run.
+    """
+
+    def __init__(self):
+        self.files = []
+
+    def text(self, name, content):
+        self.files.append(('text', name, content))
+
+    def page(self, name, page):
+        self.files.append(('page', name, page))
+
+    def publish_to(self, publisher):
+        for kind, name, content in self.files:
+            getattr(publisher, kind)(name, content)
@@ -0,0 +1,90 @@
+import datetime
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from events import Event, from_microseconds, to_microseconds
+from instrumentation import count
+
+# hlavicka: magic, verze, pocet udalosti, delka tabulky retezcu
+HEADER = struct.Struct('<4sHxxII')
+# start, end, created, updated jako epoch v mikrosekundach + UTC offset v sekundach, pak offset a delka nazvu a id
+RECORD = struct.Struct('<qqqqiiiiIIII')
+MAGIC = b'HCRS'
+VERSION = 1
+# offset pro datumy bez casove zony (celodenni udalosti)
+NAIVE = -2 ** 31
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _pack_time(value):
+    if value.tzinfo is None:
+        return to_microseconds(value), NAIVE
+    return to_microseconds(value), int(value.utcoffset().total_seconds())
+
+
+def _unpack_time(epoch, offset):
+    value = from_microseconds(epoch)
+    if offset == NAIVE:
+        return value.replace(tzinfo=None)
+    return value.astimezone(datetime.timezone(datetime.timedelta(seconds=offset)))
+
+
+def write_snapshot(path, events):
+    records = []
+    strings = bytearray()
+    for event in events:
+        name = event.name.encode('utf-8')
+        id = event.id.encode('utf-8')
+        times = [_pack_time(value) for value in (event.start_time, event.end_time, event.created, event.updated)]
+        records.append(RECORD.pack(
+            times[0][0], times[1][0], times[2][0], times[3][0],
+            times[0][1], times[1][1], times[2][1], times[3][1],
+            len(strings), len(name), len(strings) + len(name), len(id)
+        ))
+        strings += name
+        strings += id
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = '{0}.tmp'.format(path)
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records), len(strings)))
+        f.write(b''.join(records))
+        f.write(strings)
+        written = f.tell()
+    os.replace(tmp_path, path)
+    count('snapshot', events=len(records), bytes_written=written)
+
+
+def read_snapshot(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise SnapshotError('{0}: truncated snapshot'.format(path))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, event_count, strings_size = HEADER.unpack_from(data, 0)
+            if magic != MAGIC:
+                raise SnapshotError('{0}: not a snapshot file'.format(path))
+            if version != VERSION:
+                raise SnapshotError('{0}: unsupported snapshot version {1}'.format(path, version))
+
+            strings_start = HEADER.size + event_count * RECORD.size
+            if len(data) != strings_start + strings_size:
+                raise SnapshotError('{0}: truncated snapshot'.format(path))
+
+            events = []
+            for record in RECORD.iter_unpack(data[HEADER.size:strings_start]):
+                name_start = strings_start + record[8]
+                id_start = strings_start + record[10]
+                events.append(Event(
+                    name=data[name_start:name_start + record[9]].decode('utf-8'),
+                    start_time=_unpack_time(record[0], record[4]),
+                    end_time=_unpack_time(record[1], record[5]),
+                    created=_unpack_time(record[2], record[6]),
+                    updated=_unpack_time(record[3], record[7]),
+                    id=data[id_start:id_start + record[11]].decode('utf-8')
+                ))
+            return events
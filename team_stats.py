@@ -0,0 +1,141 @@
+"""Vectorized team statistics of matches_times.py for many matches at once, needs NumPy (optional dependency)."""
+import datetime
+
+import numpy as np
+
+from boundaries import get_boundary_calendar
+from events import EventBatch
+from teams import get_registry, new_team
+
+DAY = 86400
+HOUR = 3600
+# 1.1.1970 byl ctvrtek, weekday 0-po, ... 6-ne
+EPOCH_WEEKDAY = 3
+NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = NAIVE_EPOCH.toordinal()
+SECOND = datetime.timedelta(seconds=1)
+# hranice get_time_interval()
+HOUR_EDGES = np.array([10, 12, 20, 22])
+HOUR_BUCKETS = ['6-10', '10-12', '12-20', '20-22', '22-23']
+
+
+def wall_clock(value):
+    # sekundy od epochy v mistnim case udalosti, tj. value.replace(tzinfo=None)
+    return (value.replace(tzinfo=None) - NAIVE_EPOCH) // SECOND
+
+
+class MatchArrays:
+    """Matches as columns: wall clock start/end in seconds and home/guest team ids of the TeamRegistry.
+
+    team_names maps the ids back to canonical names; first_appearance() gives the order of aggregate_teams().
+    Building the arrays is the only per-match Python loop; masks select seasons or leagues afterwards.
+    """
+
+    def __init__(self, start, end, home, guest, team_names):
+        self.start = start
+        self.end = end
+        self.home = home
+        self.guest = guest
+        self.team_names = team_names
+
+    @classmethod
+    def from_events(cls, events, registry=None):
+        return cls.from_batch(EventBatch.from_events(events), registry)
+
+    @classmethod
+    def from_batch(cls, batch, registry=None):
+        """Matches of an EventBatch; titles are parsed once per distinct name of its string table."""
+        if registry is None:
+            registry = get_registry()
+        # -1 pro nazvy, ktere nejsou zapasem
+        teams = np.array([registry.match_ids(name) or (-1, -1) for name in batch.names], dtype=np.int64)
+        teams = teams.reshape(-1, 2)[np.frombuffer(batch.name_codes, dtype=np.uint32)]
+        matches = teams[:, 0] >= 0
+        start = np.frombuffer(batch.start, dtype=np.int64) + np.frombuffer(batch.start_offset, dtype=np.int32)
+        end = np.frombuffer(batch.end, dtype=np.int64) + np.frombuffer(batch.end_offset, dtype=np.int32)
+        return cls(start[matches], end[matches], teams[matches, 0], teams[matches, 1], list(registry.names))
+
+    def __len__(self):
+        return len(self.start)
+
+
+def weekdays(wall):
+    return (wall // DAY + EPOCH_WEEKDAY) % 7
+
+
+def hour_buckets(wall):
+    return np.digitize((wall % DAY) // HOUR, HOUR_EDGES)
+
+
+def boundary_hours(days, calendar=None):
+    """Boundary hours of the BoundaryCalendar for an array of days since the epoch."""
+    if calendar is None:
+        calendar = get_boundary_calendar()
+    if not len(days):
+        return np.zeros(0, dtype=np.int64)
+    first, hours = calendar.table(int(days.min()) + EPOCH_ORDINAL, int(days.max()) + EPOCH_ORDINAL)
+    return np.frombuffer(hours, dtype=np.uint8).astype(np.int64)[days + (EPOCH_ORDINAL - first)]
+
+
+def late_minutes(start, end, calendar=None):
+    """late_minutes() of matches_times.py for arrays of wall clock seconds."""
+    end_day = end // DAY
+    boundary = end_day * DAY + boundary_hours(end_day, calendar) * HOUR
+    # zapas zacal az po hranici, pocita se od jeho zacatku
+    boundary = np.where(start > boundary, end_day * DAY + start % DAY, boundary)
+    return np.where(boundary >= end, 0, ((end - boundary) % DAY) // 60)
+
+
+def _columns(matches, mask):
+    if mask is None:
+        return matches.start, matches.end, matches.home, matches.guest
+    return matches.start[mask], matches.end[mask], matches.home[mask], matches.guest[mask]
+
+
+def first_appearance(matches, mask=None):
+    """Team ids ordered by the first selected match of each team, teams without a match are left out."""
+    _, _, home, guest = _columns(matches, mask)
+    positions = np.arange(len(home)) * 2
+    first = np.full(len(matches.team_names), np.iinfo(np.int64).max)
+    np.minimum.at(first, home, positions)
+    np.minimum.at(first, guest, positions + 1)
+    order = np.argsort(first, kind='stable')
+    return order[first[order] != np.iinfo(np.int64).max]
+
+
+def team_histograms(matches, mask=None, calendar=None):
+    """Per-team match counts, weekday counts (teams x 7), hour bucket counts (teams x 5) and late minutes."""
+    start, end, home, guest = _columns(matches, mask)
+    size = len(matches.team_names)
+
+    # kazdy zapas se pocita obema tymum, pozdni minuty staci spocitat jednou
+    teams = np.concatenate((home, guest))
+    days = np.tile(weekdays(start), 2)
+    hours = np.tile(hour_buckets(start), 2)
+    late = np.tile(late_minutes(start, end, calendar), 2)
+
+    return (
+        np.bincount(teams, minlength=size),
+        np.bincount(teams * 7 + days, minlength=size * 7).reshape(size, 7),
+        np.bincount(teams * len(HOUR_BUCKETS) + hours, minlength=size * len(HOUR_BUCKETS)).reshape(size, -1),
+        np.bincount(teams, weights=late, minlength=size).astype(np.int64)
+    )
+
+
+def aggregate_teams_vectorized(events, calendar=None):
+    """Same result as matches_times.aggregate_teams(events), computed with NumPy."""
+    return teams_from_arrays(MatchArrays.from_events(events), calendar=calendar)
+
+
+def teams_from_arrays(matches, mask=None, calendar=None):
+    counts, days, hours, late = team_histograms(matches, mask, calendar)
+    teams = {}
+    for team_id in first_appearance(matches, mask):
+        name = matches.team_names[team_id]
+        team = new_team(name)
+        team['matches_count'] = int(counts[team_id])
+        team['days'] = {str(day): int(value) for day, value in enumerate(days[team_id])}
+        team['hours'] = {bucket: int(value) for bucket, value in zip(HOUR_BUCKETS, hours[team_id])}
+        team['late_minutes'] = int(late[team_id])
+        teams[name] = team
+    return teams
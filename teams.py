@@ -0,0 +1,145 @@
+import configparser
+import hashlib
+import logging
+import re
+import threading
+from pathlib import Path
+
+# 'LHL č. 12 Bystřec \ Udánky 1.liga'; ukotveno na 'LHL č. N', tymy jsou nenasytne a konci zpetnym lomitkem
+# a cislem ligy, takze cislice v nazvu tymu ('HC 1973 Bystřec', 'Sokol 2') zustanou jeho soucasti
+MATCH_TITLE = re.compile(r'LHL\s+č\.\s*(\d+)\s+(.*?)\s*\\\s*(.*?)\s*(\d)\.liga')
+TEAMS_FILE = Path(__file__).with_name('teams.ini')
+
+
+class MatchTitle:
+    __slots__ = ('number', 'home', 'guest', 'league')
+
+    def __init__(self, number, home, guest, league):
+        self.number = number
+        self.home = home
+        self.guest = guest
+        self.league = league
+
+    def __repr__(self):
+        return 'MatchTitle({0}, {1!r}, {2!r}, {3})'.format(self.number, self.home, self.guest, self.league)
+
+
+def parse_match_title(name):
+    """Match number, home and guest team as written in the calendar and league of a league match, None otherwise."""
+    matched = MATCH_TITLE.match(name)
+    if matched is None:
+        return None
+    return MatchTitle(int(matched.group(1)), matched.group(2).replace('!', '').strip(), matched.group(3).strip(),
+                      int(matched.group(4)))
+
+
+class TeamRegistry:
+    """Canonical team names with integer ids and the spellings used for them in the calendar.
+
+    Spellings are resolved once and remembered. A spelling that is neither a known team nor an alias
+    becomes a team of its own and is reported in unknown, so a new misspelling shows up instead of splitting
+    a team's statistics silently.
+    """
+
+    def __init__(self, teams=(), aliases=None, prefixes=None):
+        self.names = []
+        self.aliases = dict(aliases or {})
+        self.prefixes = dict(prefixes or {})
+        self.unknown = set()
+        self._ids = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+        for name in list(teams) + list(self.aliases.values()) + list(self.prefixes.values()):
+            self._add(name)
+        self._known = len(self.names)
+
+    @classmethod
+    def load(cls, path=TEAMS_FILE):
+        """Registry from [TEAMS], [ALIASES] and [PREFIXES] of an ini file, empty when the file does not exist."""
+        parser = configparser.ConfigParser(allow_no_value=True, delimiters=('=',))
+        # nazvy tymu rozlisuji velikost pismen
+        parser.optionxform = str
+        parser.read(path, encoding='utf-8')
+        sections = {name: parser[name] if parser.has_section(name) else {} for name in ('TEAMS', 'ALIASES', 'PREFIXES')}
+        return cls(list(sections['TEAMS']), dict(sections['ALIASES']), dict(sections['PREFIXES']))
+
+    def _add(self, name):
+        team_id = self._ids.get(name)
+        if team_id is None:
+            team_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return team_id
+
+    def canonical(self, spelling):
+        name = self.aliases.get(spelling)
+        if name is not None:
+            return name
+        for prefix, name in self.prefixes.items():
+            if spelling.startswith(prefix):
+                return name
+        return spelling
+
+    def resolve(self, spelling):
+        """Team id of a spelling from the calendar."""
+        team_id = self._resolved.get(spelling)
+        if team_id is not None:
+            return team_id
+
+        with self._lock:
+            team_id = self._add(self.canonical(spelling))
+            if self._known and team_id >= self._known and spelling not in self.unknown:
+                self.unknown.add(spelling)
+                logging.warning(f'Unknown team spelling {spelling!r}, add it to [TEAMS] or [ALIASES] of teams.ini')
+            self._resolved[spelling] = team_id
+        return team_id
+
+    def fingerprint(self):
+        """Hash of the known teams and spellings, changes whenever teams.ini resolves some spelling differently."""
+        known = (self.names[:self._known], sorted(self.aliases.items()), list(self.prefixes.items()))
+        return hashlib.sha1(repr(known).encode('utf-8')).hexdigest()
+
+    def name(self, team_id):
+        return self.names[team_id]
+
+    def match_ids(self, name):
+        """(home id, guest id) of a league match, None for other events."""
+        title = parse_match_title(name)
+        if title is None:
+            return None
+        return self.resolve(title.home), self.resolve(title.guest)
+
+
+_registry = None
+
+
+def load_registry(path=TEAMS_FILE):
+    """Replace the registry used by match_teams() with one loaded from path."""
+    global _registry
+    _registry = TeamRegistry.load(path)
+    return _registry
+
+
+def get_registry():
+    if _registry is None:
+        return load_registry()
+    return _registry
+
+
+def match_teams(name):
+    """Return normalized (home, guest) team names of a league match, None for other events."""
+    registry = get_registry()
+    ids = registry.match_ids(name)
+    if ids is None:
+        return None
+    return registry.names[ids[0]], registry.names[ids[1]]
+
+
+def new_team(name):
+    """Empty per-team totals of matches_times.py and team_stats.py."""
+    return {
+        'name': name,
+        'matches_count': 0,
+        'days': {'0': 0, '1': 0, '2': 0, '3': 0, '4': 0, '5': 0, '6': 0},
+        'hours': {'6-10': 0, '10-12': 0, '12-20': 0, '20-22': 0, '22-23': 0},
+        'late_minutes': 0
+    }
@@ -0,0 +1,118 @@
+from collections import deque
+
+
+class View:
+    """One output page: events of a calendar whose name contains all keywords (case-insensitive).
+
+    Changes of views with notify=True are reported by email.
+    """
+
+    __slots__ = ('calendar', 'keywords', 'name', 'headline', 'notify')
+
+    def __init__(self, calendar, keywords, name, headline, notify=False):
+        self.calendar = calendar
+        self.keywords = tuple(keywords)
+        self.name = name
+        self.headline = headline
+        self.notify = notify
+
+    @property
+    def text_file(self):
+        return '{0}.txt'.format(self.name)
+
+    @property
+    def html_file(self):
+        return '{0}.html'.format(self.name)
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton finding all casefolded keywords in a text in a single pass."""
+
+    def __init__(self, keywords):
+        self.keywords = []
+        self._keyword_ids = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for keyword in keywords:
+            self._add(keyword.casefold())
+        self._build()
+
+    def keyword_id(self, keyword):
+        return self._keyword_ids[keyword.casefold()]
+
+    def _add(self, keyword):
+        if keyword in self._keyword_ids:
+            return
+        keyword_id = len(self.keywords)
+        self.keywords.append(keyword)
+        self._keyword_ids[keyword] = keyword_id
+
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + (keyword_id,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail_state = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail_state if fail_state != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Return ids of all keywords occurring in text."""
+        found = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class ViewRouter:
+    def __init__(self, views):
+        self.views = list(views)
+        self.matcher = KeywordMatcher(keyword for view in self.views for keyword in view.keywords)
+
+        # calendar -> [(view, ids of required keywords)]
+        self._views_by_calendar = {}
+        for view in self.views:
+            required = frozenset(self.matcher.keyword_id(keyword) for keyword in view.keywords)
+            self._views_by_calendar.setdefault(view.calendar, []).append((view, required))
+
+    def route(self, events_by_calendar):
+        """Distribute events to all matching views, each event is scanned once. Returns {view.name: [events]}."""
+        routed = {view.name: [] for view in self.views}
+        for calendar, events in events_by_calendar.items():
+            calendar_views = self._views_by_calendar.get(calendar, [])
+            if not calendar_views:
+                continue
+            for event in events:
+                found = self.matcher.find(event.name)
+                if not found:
+                    continue
+                for view, required in calendar_views:
+                    if required <= found:
+                        routed[view.name].append(event)
+        return routed